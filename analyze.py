@@ -1,5 +1,10 @@
 import pandas as pd
-from main import MongoDBConnection
+from main import MongoDBConnection, apply_batch_size
+import config
+import field_profile
+import ingest
+import parallel_fetch
+import query_cache
 from typing import List, Dict, Any
 
 
@@ -8,35 +13,64 @@ def fetch_data_to_dataframe(
     database_name: str,
     collection_name: str,
     query: Dict[str, Any] = None,
-    limit: int = None
+    limit: int = None,
+    projection: Dict[str, Any] = None,
+    use_cache: bool = True
 ) -> pd.DataFrame:
+    cache = query_cache.get_cache() if use_cache else None
+    if cache is not None:
+        key = query_cache.cache_key(database_name, collection_name, query, projection, limit)
+        df = cache.get(key, lambda: query_cache.collection_fingerprint(connection, database_name, collection_name))
+        if df is not None:
+            print(f"Loaded {len(df)} rows for {database_name}.{collection_name} from the query cache")
+            return df
+        fingerprint = query_cache.collection_fingerprint(connection, database_name, collection_name)
+    
     collection = connection.get_collection(database_name, collection_name)
     
-    cursor = collection.find(query or {})
-    if limit:
-        cursor = cursor.limit(limit)
+    if parallel_fetch.enabled(limit):
+        df = parallel_fetch.fetch_partitioned(connection, database_name, collection_name, query, projection)
+    else:
+        cursor = apply_batch_size(collection.find(query or {}, projection))
+        if limit:
+            cursor = cursor.limit(limit)
+        
+        if config.STREAM_BATCH_SIZE:
+            df = ingest.stream_to_frame(cursor, batch_size=config.STREAM_BATCH_SIZE)
+        else:
+            data = list(cursor)
+            df = pd.DataFrame(data)
     
-    data = list(cursor)
-    return pd.DataFrame(data)
+    if cache is not None:
+        cache.put(key, df, fingerprint, database_name, collection_name)
+    return df
 
 
 def analyze_collection(
     connection: MongoDBConnection,
     database_name: str,
-    collection_name: str
-) -> None:
-    df = fetch_data_to_dataframe(connection, database_name, collection_name)
+    collection_name: str,
+    sample_size: int = config.PROFILE_SAMPLE_SIZE
+) -> field_profile.CollectionProfile:
+    collection = connection.get_collection(database_name, collection_name)
+    profile = field_profile.profile_collection(collection, sample_size=sample_size)
+    summary = profile.summary()
     
     print(f"\nCollection: {collection_name}")
-    print(f"Total documents: {len(df)}")
-    print(f"\nDataFrame shape: {df.shape}")
-    print(f"\nColumn names: {list(df.columns)}")
-    print(f"\nFirst few rows:")
-    print(df.head())
+    print(f"Total documents: {profile.population if profile.sampled() else profile.documents}")
+    if profile.sampled():
+        print(f"Sampled documents: {profile.documents} (null % and mean are ± 95% intervals, distinct counts are within the sample)")
+    print(f"\nShape: ({profile.documents}, {len(profile.fields)})")
+    print(f"\nField names: {list(profile.fields)}")
+    print(f"\nExample rows:")
+    print(profile.example_frame())
     print(f"\nData types:")
-    print(df.dtypes)
-    print(f"\nBasic statistics:")
-    print(df.describe())
+    print(summary['dtype'] if not summary.empty else summary)
+    print(f"\nField statistics (distinct ±{100 * field_profile.HyperLogLog().relative_error():.1f}%, quantiles approximate):")
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(summary.drop(columns=['dtype']) if not summary.empty else summary)
+    
+    return profile
 
 
 if __name__ == "__main__":
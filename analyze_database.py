@@ -1,7 +1,12 @@
+import math
+from pymongo.errors import ExecutionTimeout
 from main import MongoDBConnection
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import config
+import rendering
 from collections import defaultdict
+from typing import Optional, TextIO
 
 
 def get_week_start(date: datetime) -> datetime:
@@ -10,27 +15,106 @@ def get_week_start(date: datetime) -> datetime:
     return week_start.replace(hour=0, minute=0, second=0, microsecond=0)
 
 
+DATE_FIELDS = ["created_at", "updated_at", "createdAt", "updatedAt"]
+
+
+def build_week_query(date_fields: list, week_start: datetime) -> dict:
+    return {"$or": [{field: {"$gte": week_start}} for field in date_fields]}
+
+
+def indexed_date_fields(index_info: list) -> list:
+    leading_keys = {next(iter(idx['keys'])) for idx in index_info if idx['keys']}
+    return [field for field in DATE_FIELDS if field in leading_keys]
+
+
+def wilson_interval(matches: int, sample_size: int, z: float = 1.96) -> tuple:
+    if sample_size == 0:
+        return 0.0, 0.0
+    p = matches / sample_size
+    denominator = 1 + z ** 2 / sample_size
+    center = (p + z ** 2 / (2 * sample_size)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / sample_size + z ** 2 / (4 * sample_size ** 2)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def exact_counts(collection, week_start: datetime) -> dict:
+    return {
+        "total_count": collection.count_documents({}),
+        "week_count": collection.count_documents(build_week_query(DATE_FIELDS, week_start)),
+        "count_method": "exact"
+    }
+
+
+def field_present(collection, field: str, timeout_ms: int = config.SCAN_PROBE_TIMEOUT_MS) -> bool:
+    try:
+        cursor = collection.find({field: {"$exists": True}}, {"_id": 1}).limit(1).max_time_ms(timeout_ms)
+        return next(iter(cursor), None) is not None
+    except ExecutionTimeout:
+        return True
+
+
+def estimated_counts(collection, week_start: datetime, index_info: list, sample_size: int) -> dict:
+    total_count = collection.estimated_document_count()
+    
+    date_fields = [field for field in DATE_FIELDS if field_present(collection, field)]
+    if not date_fields:
+        return {"total_count": total_count, "week_count": 0, "count_method": "no date fields"}
+    
+    week_query = build_week_query(date_fields, week_start)
+    indexed = indexed_date_fields(index_info)
+    if all(field in indexed for field in date_fields):
+        return {
+            "total_count": total_count,
+            "week_count": collection.count_documents(week_query),
+            "count_method": f"indexed ({', '.join(date_fields)})"
+        }
+    
+    if total_count <= sample_size:
+        return {
+            "total_count": total_count,
+            "week_count": collection.count_documents(week_query),
+            "count_method": "exact (small collection)"
+        }
+    
+    pipeline = [
+        {"$sample": {"size": sample_size}},
+        {"$match": week_query},
+        {"$count": "matches"}
+    ]
+    matches = next(collection.aggregate(pipeline), {}).get("matches", 0)
+    low, high = wilson_interval(matches, sample_size)
+    week_count = round(total_count * matches / sample_size)
+    
+    return {
+        "total_count": total_count,
+        "week_count": week_count,
+        "week_count_error": round(total_count * max(high - matches / sample_size, matches / sample_size - low)),
+        "count_method": f"sampled (n={sample_size})"
+    }
+
+
+def format_week_count(result: dict) -> str:
+    if "week_count_error" in result:
+        return f"~{result['week_count']:,} ± {result['week_count_error']:,}"
+    return f"{result['week_count']:,}"
+
+
 def analyze_collection(connection: MongoDBConnection, db_name: str, collection_name: str, week_start: datetime) -> dict:
     collection = connection.get_collection(db_name, collection_name)
     
-    total_count = collection.count_documents({})
+    indexes = list(collection.list_indexes())
+    index_info = [{"name": idx.get("name"), "keys": idx.get("key")} for idx in indexes]
     
-    week_query = {
-        "$or": [
-            {"created_at": {"$gte": week_start}},
-            {"updated_at": {"$gte": week_start}},
-            {"createdAt": {"$gte": week_start}},
-            {"updatedAt": {"$gte": week_start}}
-        ]
-    }
+    sample_doc = collection.find_one({})
     
-    week_count = collection.count_documents(week_query)
+    if config.SCAN_COUNT_MODE == "estimated":
+        counts = estimated_counts(collection, week_start, index_info, config.SCAN_SAMPLE_SIZE)
+    else:
+        counts = exact_counts(collection, week_start)
     
-    if week_count == 0:
+    if counts["week_count"] == 0 and "week_count_error" not in counts:
         return None
     
-    sample_doc = collection.find_one({})
-    
     fields = {}
     if sample_doc:
         def extract_fields(doc, prefix=""):
@@ -52,18 +136,50 @@ def analyze_collection(connection: MongoDBConnection, db_name: str, collection_n
                     fields[full_key] = field_type
         extract_fields(sample_doc)
     
-    indexes = list(collection.list_indexes())
-    index_info = [{"name": idx.get("name"), "keys": idx.get("key")} for idx in indexes]
-    
     return {
-        "total_count": total_count,
-        "week_count": week_count,
+        **counts,
         "fields": fields,
         "indexes": index_info,
         "sample_keys": list(sample_doc.keys()) if sample_doc else []
     }
 
 
+def scan_collections(connection: MongoDBConnection, targets: list, week_start: datetime, concurrency: int) -> dict:
+    results = {}
+    
+    print(f"\nScanning {len(targets)} collections with up to {concurrency} concurrent workers...")
+    
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {
+            executor.submit(analyze_collection, connection, db_name, collection_name, week_start): (db_name, collection_name)
+            for db_name, collection_name in targets
+        }
+        
+        for completed, future in enumerate(as_completed(futures), start=1):
+            db_name, collection_name = futures[future]
+            prefix = f"  [{completed}/{len(targets)}] {db_name}.{collection_name}"
+            
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"{prefix}: ✗ {e}")
+                continue
+            
+            results[(db_name, collection_name)] = result
+            if result:
+                print(f"{prefix}: ✓ {format_week_count(result)} documents updated this week (total: {result['total_count']})")
+            else:
+                print(f"{prefix}: no updates this week")
+    
+    findings = defaultdict(dict)
+    for db_name, collection_name in targets:
+        result = results.get((db_name, collection_name))
+        if result:
+            findings[db_name][collection_name] = result
+    
+    return findings
+
+
 def main():
     connection = MongoDBConnection()
     
@@ -78,29 +194,21 @@ def main():
         
         db_names = client.list_database_names()
         
-        findings = defaultdict(dict)
-        
+        targets = []
         for db_name in db_names:
             if db_name in ["admin", "local", "config"]:
                 continue
             
-            print(f"Analyzing database: {db_name}")
+            print(f"Listing collections in database: {db_name}")
             db = connection.get_database(db_name)
-            collections = db.list_collection_names()
-            
-            for collection_name in collections:
-                print(f"  Checking collection: {collection_name}")
-                result = analyze_collection(connection, db_name, collection_name, week_start)
-                
-                if result:
-                    findings[db_name][collection_name] = result
-                    print(f"    ✓ {result['week_count']} documents updated this week (total: {result['total_count']})")
+            targets.extend((db_name, collection_name) for collection_name in sorted(db.list_collection_names()))
         
-        report = generate_report(findings, week_start)
+        findings = scan_collections(connection, targets, week_start, config.SCAN_CONCURRENCY)
         
-        filename = f"{datetime.now().strftime('%Y%m%d')}data-analysis.md"
-        with open(filename, 'w') as f:
-            f.write(report)
+        fmt = rendering.check_format(config.SCAN_REPORT_FORMAT)
+        filename = f"{datetime.now().strftime('%Y%m%d')}data-analysis{rendering.FORMATS[fmt]}"
+        with open(filename, 'w', encoding='utf-8') as f:
+            generate_report(findings, week_start, fmt, f)
         
         print(f"\n✓ Analysis complete! Report saved to {filename}")
         
@@ -112,81 +220,98 @@ def main():
         connection.disconnect()
 
 
-def generate_report(findings: dict, week_start: datetime) -> str:
-    report = f"# MongoDB Database Analysis\n\n"
-    report += f"**Analysis Date:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-    report += f"**Week Start:** {week_start.strftime('%Y-%m-%d')}\n\n"
-    report += "---\n\n"
+def write_report(writer: rendering.ReportWriter, findings: dict, week_start: datetime) -> None:
+    writer.heading("MongoDB Database Analysis", 1)
+    writer.paragraph(f"**Analysis Date:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    writer.paragraph(f"**Week Start:** {week_start.strftime('%Y-%m-%d')}")
+    writer.rule()
     
     if not findings:
-        report += "## No Collections Updated This Week\n\n"
-        report += "No collections found with updates since the week start date.\n"
-        return report
+        writer.heading("No Collections Updated This Week")
+        writer.paragraph("No collections found with updates since the week start date.")
+        return
     
-    report += "## Summary\n\n"
+    writer.heading("Summary")
     total_collections = sum(len(collections) for collections in findings.values())
-    report += f"- **Databases with updates:** {len(findings)}\n"
-    report += f"- **Collections with updates:** {total_collections}\n\n"
+    writer.bullets([
+        f"**Databases with updates:** {len(findings)}",
+        f"**Collections with updates:** {total_collections}"
+    ])
     
-    report += "---\n\n"
+    writer.rule()
     
     for db_name, collections in sorted(findings.items()):
-        report += f"## Database: `{db_name}`\n\n"
+        writer.heading(f"Database: `{db_name}`")
         
         for collection_name, data in sorted(collections.items()):
-            report += f"### Collection: `{collection_name}`\n\n"
-            report += f"- **Total Documents:** {data['total_count']:,}\n"
-            report += f"- **Updated This Week:** {data['week_count']:,}\n\n"
+            writer.heading(f"Collection: `{collection_name}`", 3)
+            details = [
+                f"**Total Documents:** {data['total_count']:,}",
+                f"**Updated This Week:** {format_week_count(data)}"
+            ]
+            if data.get('count_method', 'exact') != 'exact':
+                details.append(f"**Count Method:** {data['count_method']}")
+            writer.bullets(details)
             
             if data['fields']:
-                report += "#### Schema Fields\n\n"
-                report += "| Field | Type |\n"
-                report += "|-------|------|\n"
-                for field, field_type in sorted(data['fields'].items()):
-                    report += f"| `{field}` | {field_type} |\n"
-                report += "\n"
+                writer.heading("Schema Fields", 4)
+                writer.table(["Field", "Type"], ((f"`{field}`", field_type) for field, field_type in sorted(data['fields'].items())))
             
             if data['indexes']:
-                report += "#### Indexes\n\n"
-                for idx in data['indexes']:
-                    if idx['name'] != '_id_':
-                        keys_str = ", ".join([f"`{k}` ({v})" for k, v in idx['keys'].items()])
-                        report += f"- **{idx['name']}**: {keys_str}\n"
-                report += "\n"
+                writer.heading("Indexes", 4)
+                writer.bullets(
+                    f"**{idx['name']}**: " + ", ".join(f"`{k}` ({v})" for k, v in idx['keys'].items())
+                    for idx in data['indexes'] if idx['name'] != '_id_'
+                )
             
-            report += "---\n\n"
+            writer.rule()
     
-    report += "## Recommendations for MCP Server\n\n"
-    report += "### High Priority Collections\n\n"
+    writer.heading("Recommendations for MCP Server")
+    writer.heading("High Priority Collections", 3)
+    writer.bullets(
+        f"**`{db_name}.{collection_name}`**: {data['week_count']} updates this week - High activity"
+        for db_name, collections in sorted(findings.items())
+        for collection_name, data in sorted(collections.items())
+        if data['week_count'] > 10
+    )
     
-    for db_name, collections in sorted(findings.items()):
-        for collection_name, data in sorted(collections.items()):
-            if data['week_count'] > 10:
-                report += f"- **`{db_name}.{collection_name}`**: {data['week_count']} updates this week - High activity\n"
-    
-    report += "\n### Suggested MCP Tools\n\n"
-    report += "Based on the collections analyzed, consider creating MCP tools for:\n\n"
-    report += "1. **Query Tools**:\n"
-    report += "   - Get document counts by date range\n"
-    report += "   - Filter by common fields (status, type, vendor, etc.)\n"
-    report += "   - Search by text fields\n\n"
-    
-    report += "2. **Aggregation Tools**:\n"
-    report += "   - Sum numeric fields (amounts, kWh, costs)\n"
-    report += "   - Group by categorical fields (vendor, creator, status)\n"
-    report += "   - Calculate averages and totals\n\n"
-    
-    report += "3. **Comparison Tools**:\n"
-    report += "   - Compare periods (this week vs last week)\n"
-    report += "   - Compare by category (vendor, creator)\n"
-    report += "   - Trend analysis\n\n"
-    
-    report += "4. **Pre-computed Queries**:\n"
-    report += "   - Common date ranges (today, this week, this month)\n"
-    report += "   - Common filters (active status, non-archived)\n"
-    report += "   - Top N queries (top vendors, top creators)\n\n"
-    
-    return report
+    writer.heading("Suggested MCP Tools", 3)
+    writer.paragraph("Based on the collections analyzed, consider creating MCP tools for:")
+    
+    suggestions = [
+        ("**Query Tools**:", [
+            "Get document counts by date range",
+            "Filter by common fields (status, type, vendor, etc.)",
+            "Search by text fields"
+        ]),
+        ("**Aggregation Tools**:", [
+            "Sum numeric fields (amounts, kWh, costs)",
+            "Group by categorical fields (vendor, creator, status)",
+            "Calculate averages and totals"
+        ]),
+        ("**Comparison Tools**:", [
+            "Compare periods (this week vs last week)",
+            "Compare by category (vendor, creator)",
+            "Trend analysis"
+        ]),
+        ("**Pre-computed Queries**:", [
+            "Common date ranges (today, this week, this month)",
+            "Common filters (active status, non-archived)",
+            "Top N queries (top vendors, top creators)"
+        ])
+    ]
+    for number, suggestion in enumerate(suggestions, start=1):
+        writer.numbered([suggestion], start=number)
+
+
+def generate_report(findings: dict, week_start: datetime, fmt: str = "markdown", out: Optional[TextIO] = None) -> str:
+    if fmt == "json":
+        return rendering.render_data({
+            "analysis_date": datetime.now(),
+            "week_start": week_start,
+            "databases": findings
+        }, out)
+    return rendering.render(lambda writer: write_report(writer, findings, week_start), fmt, "MongoDB Database Analysis", out)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,35 @@
+import asyncio
+import time
+from typing import Dict, Any, List
+from main import AsyncMongoDBConnection
+import bills_queries
+
+
+async def aggregate(connection: AsyncMongoDBConnection, name: str, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    collection = connection.get_collection(bills_queries.BILLS_DATABASE, bills_queries.BILLS_COLLECTION)
+    start = time.perf_counter()
+    cursor = await collection.aggregate(pipeline)
+    rows = await cursor.to_list()
+    print(f"  {name}: {len(rows)} rows in {time.perf_counter() - start:.2f}s")
+    return rows
+
+
+async def gather_pipelines(pipelines: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    connection = AsyncMongoDBConnection()
+    
+    try:
+        connection.connect()
+        results = await asyncio.gather(*(
+            aggregate(connection, name, pipeline) for name, pipeline in pipelines.items()
+        ))
+    finally:
+        await connection.disconnect()
+    
+    return dict(zip(pipelines, results))
+
+
+def run_pipelines(pipelines: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    start = time.perf_counter()
+    results = asyncio.run(gather_pipelines(pipelines))
+    print(f"Ran {len(pipelines)} queries concurrently in {time.perf_counter() - start:.2f}s")
+    return results
@@ -0,0 +1,79 @@
+import argparse
+import random
+import time
+import pandas as pd
+import billing_fields
+
+
+DEFAULT_SIZES = [100_000, 1_000_000, 5_000_000]
+POOL_SIZE = 50_000
+
+
+def make_billing(rnd: random.Random):
+    roll = rnd.random()
+    if roll < 0.05:
+        return None
+    if roll < 0.10:
+        return {}
+    if roll < 0.15:
+        return {"annual_consumption": {"total": rnd.randint(0, 50_000)}}
+    return {
+        "current_bill_consumption": {"total_amount": round(rnd.uniform(10, 2_000), 2)},
+        "annual_consumption": {
+            "total": rnd.randint(0, 50_000),
+            "cost": {"previous_year_annual_cost": round(rnd.uniform(0, 9_000), 2)}
+        }
+    }
+
+
+def make_billing_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    pool = [make_billing(rnd) for _ in range(min(rows, POOL_SIZE))]
+    repeats = rows // len(pool) + 1
+    return pd.DataFrame({"billing": (pool * repeats)[:rows]})
+
+
+def legacy_extract(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        'bill_amount': df['billing'].apply(
+            lambda x: x.get('current_bill_consumption', {}).get('total_amount', 0) if isinstance(x, dict) else 0
+        ),
+        'annual_kwh': df['billing'].apply(
+            lambda x: x.get('annual_consumption', {}).get('total', 0) if isinstance(x, dict) else 0
+        ),
+        'annual_cost': df['billing'].apply(
+            lambda x: x.get('annual_consumption', {}).get('cost', {}).get('previous_year_annual_cost', 0)
+            if isinstance(x, dict) and isinstance(x.get('annual_consumption', {}), dict)
+            and isinstance(x.get('annual_consumption', {}).get('cost', {}), dict) else 0
+        )
+    })
+
+
+def best_of(func, df: pd.DataFrame, repeat: int):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark billing metric extraction")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} | {'legacy (s)':>10} | {'columnar (s)':>12} | {'speedup':>7}")
+    print("-" * 50)
+
+    for rows in [int(size) for size in args.sizes.split(",")]:
+        df = make_billing_frame(rows)
+        legacy_time, legacy = best_of(legacy_extract, df, args.repeat)
+        columnar_time, columnar = best_of(billing_fields.extract_billing_metrics, df, args.repeat)
+        pd.testing.assert_frame_equal(legacy, columnar)
+        print(f"{rows:>10,} | {legacy_time:>10.3f} | {columnar_time:>12.3f} | {legacy_time / columnar_time:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os
+
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import VENDORS, BillGenerator, zipf_weights
+import bills_analysis
+import bucketing
+import frame_dtypes
+
+
+DEFAULT_SIZES = [1_000_000, 5_000_000]
+
+
+def weights(count: int, skew: float) -> np.ndarray:
+    values = np.array(zipf_weights(count, skew))
+    return values / values.sum()
+
+
+def make_processed_frame(rows: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    generator = BillGenerator(seed=seed)
+
+    creators = np.array(generator.creators + ["Unknown"], dtype=object)
+    created_by = creators[rng.choice(len(creators), rows, p=weights(len(creators), 1.1))]
+    vendors = np.array(VENDORS + ["Unknown"], dtype=object)
+    vendor_name = vendors[rng.choice(len(vendors), rows, p=weights(len(vendors), 1.2))]
+
+    age_seconds = generator.days * 86_400 * rng.random(rows) ** generator.recency_skew
+    created_at = pd.Series(pd.Timestamp(generator.end) - pd.to_timedelta(age_seconds.astype('int64'), unit='s'))
+    buckets = bucketing.assign_buckets(created_at, 'UTC')
+
+    return pd.DataFrame({
+        'day_start': buckets['day_start'],
+        'week_start': buckets['week_start'],
+        'week_number': buckets['week_number'],
+        'created_at': created_at,
+        'created_by': created_by,
+        'creator_normalized': pd.Series(created_by).map(bills_analysis.normalize_creator).to_numpy(dtype=object),
+        'vendor_name': vendor_name,
+        'bill_amount': np.round(rng.lognormal(5.5, 0.9, rows), 2),
+        'annual_kwh': rng.integers(0, 60_000, rows),
+        'annual_cost': np.round(rng.uniform(0, 12_000, rows), 2)
+    })
+
+
+def best_of(func, df: pd.DataFrame, repeat: int):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark categorical and narrow dtypes for processed bills")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} | {'legacy MB':>9} | {'compact MB':>10} | {'memory':>6} | "
+          f"{'legacy (s)':>10} | {'compact (s)':>11} | {'groupby':>7}")
+    print("-" * 84)
+
+    for rows in [int(size) for size in args.sizes.split(",")]:
+        legacy = make_processed_frame(rows)
+        compact = frame_dtypes.compact_bills(legacy.copy())
+
+        legacy_time, legacy_weeks = best_of(bills_analysis.aggregate_by_week, legacy, args.repeat)
+        compact_time, compact_weeks = best_of(bills_analysis.aggregate_by_week, compact, args.repeat)
+        assert legacy_weeks.to_csv(index=False) == compact_weeks.to_csv(index=False)
+
+        legacy_mb, compact_mb = frame_dtypes.memory_mb(legacy), frame_dtypes.memory_mb(compact)
+        print(f"{rows:>10,} | {legacy_mb:>9.1f} | {compact_mb:>10.1f} | {legacy_mb / compact_mb:>5.1f}x | "
+              f"{legacy_time:>10.3f} | {compact_time:>11.3f} | {legacy_time / compact_time:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
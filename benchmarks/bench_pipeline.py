@@ -0,0 +1,190 @@
+import os
+
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+
+import argparse
+import io
+import json
+import platform
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import pandas as pd
+from main import MongoDBConnection
+from benchmarks.synthetic import BillGenerator, InMemoryConnection
+import bills_analysis
+import bills_queries
+import config
+import daily_comparison
+import ingest
+import weekly_comparison
+
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+STAGES = ["fetch", "process", "aggregate", "week_stats", "render"]
+LOAD_BATCH_SIZE = 10_000
+MARKER_COLLECTION = "benchmark_marker"
+MARKER_ID = "bench_pipeline"
+
+
+def load_collection(uri: str, generator: BillGenerator, rows: int) -> None:
+    connection = MongoDBConnection(uri=uri, shared=False)
+    try:
+        database = connection.connect()[bills_queries.BILLS_DATABASE]
+        collection = database[bills_queries.BILLS_COLLECTION]
+        marker = database[MARKER_COLLECTION]
+        if collection.estimated_document_count() and marker.find_one({"_id": MARKER_ID}) is None:
+            raise RuntimeError(f"{bills_queries.BILLS_DATABASE}.{bills_queries.BILLS_COLLECTION} already holds bills "
+                               f"that were not loaded by this benchmark; refusing to drop it")
+
+        marker.replace_one({"_id": MARKER_ID}, {"_id": MARKER_ID, "seed": generator.seed, "rows": rows,
+                                                "loaded_at": datetime.now()}, upsert=True)
+        collection.drop()
+
+        batch = []
+        for bill in generator.generate(rows):
+            batch.append(bill)
+            if len(batch) >= LOAD_BATCH_SIZE:
+                collection.insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            collection.insert_many(batch, ordered=False)
+    finally:
+        connection.disconnect()
+
+
+def render_reports(processed_df: pd.DataFrame, aggregated_df: pd.DataFrame, week_stats: tuple, now: datetime) -> int:
+    current_week_start, last_week_start = weekly_comparison.get_report_weeks(now)
+    target_start, comparison_start = daily_comparison.get_report_days(now)
+
+    output = io.StringIO()
+    with redirect_stdout(output):
+        bills_analysis.print_summary(aggregated_df, processed_df)
+
+    weekly = weekly_comparison.generate_comparison_report(
+        week_stats[0], week_stats[1],
+        current_week_start.isocalendar()[1], last_week_start.isocalendar()[1]
+    )
+    daily = daily_comparison.generate_daily_report(
+        daily_comparison.get_day_stats(processed_df, target_start),
+        daily_comparison.get_day_stats(processed_df, comparison_start),
+        target_start, comparison_start
+    )
+    return len(output.getvalue()) + len(weekly) + len(daily)
+
+
+def timed(timings: Dict[str, Any], stage: str, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    timings[stage] = {"seconds": round(time.perf_counter() - start, 4), "peak_rss_mb": ingest.peak_rss_mb()}
+    return result
+
+
+def run_size(rows: int, seed: int, uri: Optional[str]) -> Dict[str, Any]:
+    generator = BillGenerator(seed=seed)
+    now = generator.end
+
+    if uri:
+        load_collection(uri, generator, rows)
+        connection = MongoDBConnection(uri=uri, shared=False)
+    else:
+        connection = InMemoryConnection(generator, rows)
+
+    timings = {}
+    try:
+        connection.connect()
+        with redirect_stdout(io.StringIO()):
+            raw_df = timed(timings, "fetch", bills_analysis.fetch_bills, connection)
+    finally:
+        connection.disconnect()
+
+    processed_df = timed(timings, "process", bills_analysis.process_bills_data, raw_df)
+    aggregated_df = timed(timings, "aggregate", bills_analysis.aggregate_by_week, processed_df)
+
+    current_week_start, last_week_start = weekly_comparison.get_report_weeks(now)
+    week_stats = timed(timings, "week_stats", lambda: (
+        weekly_comparison.get_week_stats(processed_df, current_week_start),
+        weekly_comparison.get_week_stats(processed_df, last_week_start)
+    ))
+    report_chars = timed(timings, "render", render_reports, processed_df, aggregated_df, week_stats, now)
+
+    total = sum(timing["seconds"] for timing in timings.values())
+    return {
+        "rows": rows,
+        "fetched_rows": len(raw_df),
+        "weekly_groups": len(aggregated_df),
+        "report_chars": report_chars,
+        "stages": timings,
+        "total_seconds": round(total, 4),
+        "rows_per_second": round(rows / total) if total else None,
+        "processed_memory_mb": round(processed_df.memory_usage(deep=True).sum() / 1024 ** 2, 2)
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_metadata(seed: int, uri: Optional[str]) -> Dict[str, Any]:
+    return {
+        "started_at": datetime.now().isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "backend": "mongodb" if uri else "in-memory",
+        "seed": seed,
+        "config": {
+            "STATS_MODE": config.STATS_MODE,
+            "STREAM_BATCH_SIZE": config.STREAM_BATCH_SIZE,
+            "BILL_STORE_DIR": config.BILL_STORE_DIR,
+            "REPORT_TIMEZONE": config.REPORT_TIMEZONE
+        }
+    }
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    stages = " | ".join(f"{result['stages'][stage]['seconds']:>9.3f}" for stage in STAGES)
+    peak = result['stages']['render']['peak_rss_mb']
+    print(f"{result['rows']:>10,} | {stages} | {result['total_seconds']:>8.3f} | "
+          f"{peak if peak is None else round(peak):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bills pipeline on synthetic utility bills")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma-separated collection sizes, e.g. 10000,100000,1000000,10000000")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongodb-uri", default=None,
+                        help="load the synthetic bills into bills.utility_bills on this server instead of "
+                             "serving them from memory (the collection must be empty or loaded by "
+                             "a previous benchmark run, and is dropped first)")
+    parser.add_argument("--output", default="bench_pipeline.json", help="where to write the JSON results")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    record = {"run": run_metadata(args.seed, args.mongodb_uri), "results": []}
+
+    print(f"{'rows':>10} | " + " | ".join(f"{stage:>9}" for stage in STAGES) + f" | {'total':>8} | {'peak MB':>8}")
+    print("-" * (35 + 12 * len(STAGES)))
+
+    for rows in sizes:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(run_size, rows, args.seed, args.mongodb_uri).result()
+        record["results"].append(result)
+        print_result(result)
+
+    with open(args.output, 'w') as f:
+        json.dump(record, f, indent=2)
+
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
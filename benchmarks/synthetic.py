@@ -0,0 +1,219 @@
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, List, Optional
+from bson import ObjectId
+
+
+VENDORS = [
+    "Enel Energia", "A2A Energia", "Sorgenia", "Edison Energia", "Hera Comm", "Iren Mercato",
+    "Acea Energia", "Eni Plenitude", "Engie Italia", "E.ON Energia", "Illumia", "Iberdrola",
+    "Duferco Energia", "Axpo Italia", "Wekiwi", "Octopus Energy", "NeN", "Pulsee",
+    "Estra Energie", "Dolomiti Energia", "AGSM AIM", "Alperia", "Optima Italia", "Enegan",
+    "Green Network", "Argos", "Bluenergy", "Tate", "Sinergas", "Gas Sales"
+]
+
+POOL_SIZE = 200_000
+
+EXCLUDED_CREATORS = ["68e7e7c09e5d01bd097bece9", "68e4fb9483ed084323c39240"]
+
+
+def zipf_weights(count: int, skew: float) -> List[float]:
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+def make_object_id(rnd: random.Random) -> ObjectId:
+    return ObjectId(rnd.getrandbits(96).to_bytes(12, "big"))
+
+
+def cycled_object_id(object_id: ObjectId, cycle: int) -> ObjectId:
+    return ObjectId((int.from_bytes(object_id.binary, "big") ^ (cycle << 64)).to_bytes(12, "big"))
+
+
+class BillGenerator:
+    def __init__(
+        self,
+        seed: int = 42,
+        vendor_skew: float = 1.2,
+        creator_skew: float = 1.1,
+        days: int = 730,
+        recency_skew: float = 2.0,
+        end: datetime = datetime(2025, 11, 16),
+        email_creators: int = 20,
+        agent_creators: int = 15
+    ):
+        self.seed = seed
+        self.days = days
+        self.recency_skew = recency_skew
+        self.end = end
+
+        rnd = random.Random(seed)
+        self.vendor_weights = zipf_weights(len(VENDORS), vendor_skew)
+        self.creators = (
+            [f"user{index}@risparmier.ai" for index in range(email_creators)]
+            + [str(make_object_id(rnd)) for _ in range(agent_creators)]
+        )
+        rnd.shuffle(self.creators)
+        self.creator_weights = zipf_weights(len(self.creators), creator_skew)
+
+    def make_billing(self, rnd: random.Random) -> Optional[Dict[str, Any]]:
+        roll = rnd.random()
+        if roll < 0.04:
+            return None
+        if roll < 0.07:
+            return {}
+        if roll < 0.12:
+            return {"annual_consumption": {"total": rnd.randint(500, 60_000)}}
+
+        previous_year_cost = round(rnd.uniform(300, 12_000), 2) if rnd.random() > 0.1 else None
+        return {
+            "current_bill_consumption": {
+                "total_amount": round(rnd.lognormvariate(5.5, 0.9), 2),
+                "total": rnd.randint(50, 8_000)
+            },
+            "annual_consumption": {
+                "total": rnd.randint(500, 60_000),
+                "cost": {
+                    "previous_year_annual_cost": previous_year_cost,
+                    "from_date": "2024-01-01",
+                    "to_date": "2024-12-31"
+                }
+            }
+        }
+
+    def make_bill(self, rnd: random.Random) -> Dict[str, Any]:
+        age_days = self.days * (rnd.random() ** self.recency_skew)
+        created_at = (self.end - timedelta(days=age_days)).replace(microsecond=0)
+
+        bill = {
+            "_id": make_object_id(rnd),
+            "created_at": created_at,
+            "updated_at": created_at + timedelta(minutes=rnd.randint(0, 600)),
+            "is_archived": rnd.random() < 0.05,
+            "status": rnd.choice(["published", "published", "published", "draft", "processing"])
+        }
+
+        roll = rnd.random()
+        if roll < 0.01:
+            pass
+        elif roll < 0.02:
+            bill["created_by"] = rnd.choice(EXCLUDED_CREATORS)
+        else:
+            bill["created_by"] = rnd.choices(self.creators, weights=self.creator_weights)[0]
+
+        if rnd.random() > 0.02:
+            bill["vendor_name"] = rnd.choices(VENDORS, weights=self.vendor_weights)[0]
+
+        billing = self.make_billing(rnd)
+        if billing is not None:
+            bill["billing"] = billing
+
+        return bill
+
+    def generate(self, count: int) -> Iterator[Dict[str, Any]]:
+        rnd = random.Random(self.seed)
+        for _ in range(count):
+            yield self.make_bill(rnd)
+
+
+def get_path(doc: Dict[str, Any], keys: List[str]) -> Any:
+    for key in keys:
+        if not isinstance(doc, dict) or key not in doc:
+            return None
+        doc = doc[key]
+    return doc
+
+
+def matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for field, condition in query.items():
+        value = get_path(doc, field.split("."))
+        if isinstance(condition, dict):
+            for operator, operand in condition.items():
+                if operator == "$nin" and value in operand:
+                    return False
+                if operator == "$in" and value not in operand:
+                    return False
+                if operator in ("$gte", "$gt", "$lt", "$lte") and value is None:
+                    return False
+                if operator == "$gte" and not value >= operand:
+                    return False
+                if operator == "$gt" and not value > operand:
+                    return False
+                if operator == "$lt" and not value < operand:
+                    return False
+                if operator == "$lte" and not value <= operand:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return dict(doc)
+
+    projected = {"_id": doc["_id"]}
+    for path, include in projection.items():
+        if not include:
+            continue
+        keys = path.split(".")
+        parent = get_path(doc, keys[:-1])
+        if not isinstance(parent, dict) or keys[-1] not in parent:
+            continue
+        target = projected
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = parent[keys[-1]]
+    return projected
+
+
+class InMemoryCursor:
+    def __init__(self, collection: "InMemoryCollection", query: Dict[str, Any], projection: Optional[Dict[str, Any]]):
+        self.collection = collection
+        self.query = query
+        self.projection = projection
+        self.max_rows: Optional[int] = None
+
+    def batch_size(self, size: int) -> "InMemoryCursor":
+        return self
+
+    def limit(self, count: int) -> "InMemoryCursor":
+        self.max_rows = count
+        return self
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        returned = 0
+        pool = self.collection.pool
+        for index in range(self.collection.count):
+            cycle, position = divmod(index, len(pool))
+            doc = pool[position]
+            if cycle:
+                doc = {**doc, "_id": cycled_object_id(doc["_id"], cycle)}
+            if self.max_rows is not None and returned >= self.max_rows:
+                return
+            if matches(doc, self.query):
+                returned += 1
+                yield project(doc, self.projection)
+
+
+class InMemoryCollection:
+    def __init__(self, generator: BillGenerator, count: int, pool_size: int = POOL_SIZE):
+        self.count = count
+        self.pool = list(generator.generate(max(1, min(count, pool_size))))
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> InMemoryCursor:
+        return InMemoryCursor(self, query or {}, projection)
+
+
+class InMemoryConnection:
+    def __init__(self, generator: BillGenerator, count: int, pool_size: int = POOL_SIZE):
+        self.collection = InMemoryCollection(generator, count, pool_size)
+        self.client = None
+
+    def connect(self) -> None:
+        return None
+
+    def disconnect(self) -> None:
+        return None
+
+    def get_collection(self, database_name: str, collection_name: str) -> InMemoryCollection:
+        return self.collection
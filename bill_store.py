@@ -0,0 +1,129 @@
+import json
+import os
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Optional
+from main import MongoDBConnection, apply_batch_size
+import bills_queries
+import config
+import parallel_fetch
+
+
+STORE_PROJECTION = {
+    "created_at": 1,
+    "updated_at": 1,
+    "created_by": 1,
+    "vendor_name": 1,
+    "is_archived": 1,
+    "billing.current_bill_consumption.total_amount": 1,
+    "billing.annual_consumption.total": 1,
+    "billing.annual_consumption.cost.previous_year_annual_cost": 1,
+    "billing.annual_consumption.cost.from_date": 1,
+    "billing.annual_consumption.cost.to_date": 1
+}
+
+
+class BillStore:
+    def __init__(self, directory: str = config.BILL_STORE_DIR):
+        self.directory = directory
+        self.bills_path = os.path.join(directory, "bills.pkl")
+        self.state_path = os.path.join(directory, "state.json")
+
+    def load(self) -> pd.DataFrame:
+        if not os.path.exists(self.bills_path):
+            return pd.DataFrame()
+        return pd.read_pickle(self.bills_path)
+
+    def load_watermark(self) -> Optional[datetime]:
+        if not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path) as f:
+            state = json.load(f)
+        watermark = state.get("watermark")
+        return datetime.fromisoformat(watermark) if watermark else None
+
+    def save(self, bills: pd.DataFrame, watermark: Optional[datetime]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+        tmp_bills_path = self.bills_path + ".tmp"
+        bills.to_pickle(tmp_bills_path)
+        os.replace(tmp_bills_path, self.bills_path)
+
+        state = {
+            "watermark": watermark.isoformat() if watermark else None,
+            "synced_at": datetime.now().isoformat(),
+            "bills_count": len(bills)
+        }
+        tmp_state_path = self.state_path + ".tmp"
+        with open(tmp_state_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_state_path, self.state_path)
+
+
+def delta_query(watermark: datetime) -> dict:
+    return {
+        "$or": [
+            {"created_at": {"$gte": watermark}},
+            {"updated_at": {"$gte": watermark}}
+        ]
+    }
+
+
+def max_timestamp(df: pd.DataFrame) -> Optional[datetime]:
+    timestamps = [pd.to_datetime(df[field], errors='coerce').max()
+                  for field in ('created_at', 'updated_at') if field in df.columns]
+    timestamps = [ts for ts in timestamps if pd.notna(ts)]
+    return max(timestamps).to_pydatetime() if timestamps else None
+
+
+def merge_bills(stored: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    if stored.empty:
+        return delta.reset_index(drop=True)
+    if delta.empty:
+        return stored
+
+    merged = pd.concat([stored, delta], ignore_index=True)
+    return merged.drop_duplicates(subset='_id', keep='last').reset_index(drop=True)
+
+
+def sync_bills(connection: MongoDBConnection, store: BillStore, full_refresh: bool = False,
+               lag_minutes: float = config.BILL_STORE_WATERMARK_LAG_MINUTES) -> pd.DataFrame:
+    collection = connection.get_collection(bills_queries.BILLS_DATABASE, bills_queries.BILLS_COLLECTION)
+
+    watermark = None if full_refresh else store.load_watermark()
+    stored = pd.DataFrame() if watermark is None else store.load()
+    since = None if watermark is None else watermark - timedelta(minutes=lag_minutes)
+
+    query = {} if since is None else delta_query(since)
+    if watermark is None and parallel_fetch.enabled():
+        delta = parallel_fetch.fetch_partitioned(connection, bills_queries.BILLS_DATABASE, bills_queries.BILLS_COLLECTION,
+                                                 query, STORE_PROJECTION)
+    else:
+        delta = pd.DataFrame(list(apply_batch_size(collection.find(query, STORE_PROJECTION))))
+
+    if watermark is None:
+        print(f"Bill store: full sync, {len(delta)} bills")
+    else:
+        print(f"Bill store: {len(delta)} new or changed bills since {since.isoformat()}")
+
+    merged = merge_bills(stored, delta)
+    new_watermark = max_timestamp(delta) or watermark
+    store.save(merged, new_watermark)
+
+    return merged
+
+
+def active_bills(bills: pd.DataFrame) -> pd.DataFrame:
+    if bills.empty:
+        return bills
+
+    mask = bills['is_archived'].eq(False) if 'is_archived' in bills.columns else pd.Series(False, index=bills.index)
+    if 'created_by' in bills.columns:
+        mask &= ~bills['created_by'].isin(config.EXCLUDED_USER_IDS)
+
+    return bills[mask].drop(columns=['is_archived', 'updated_at'], errors='ignore').reset_index(drop=True)
+
+
+def fetch_bills(connection: MongoDBConnection, full_refresh: bool = config.BILL_STORE_FULL_REFRESH) -> pd.DataFrame:
+    store = BillStore()
+    return active_bills(sync_bills(connection, store, full_refresh=full_refresh))
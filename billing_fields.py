@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+
+BILLING_METRIC_PATHS = {
+    "bill_amount": "current_bill_consumption.total_amount",
+    "annual_kwh": "annual_consumption.total",
+    "annual_cost": "annual_consumption.cost.previous_year_annual_cost"
+}
+
+MISSING = object()
+
+
+def resolve_level(nodes: List[Any], key: str, missing: Any = MISSING) -> List[Any]:
+    return [node.get(key, missing) if isinstance(node, dict) else missing for node in nodes]
+
+
+def to_numeric_column(values: List[Any], index: Optional[pd.Index]) -> pd.Series:
+    array = np.array(values)
+    if array.dtype.kind not in 'biuf':
+        return pd.to_numeric(pd.Series(values, index=index, dtype=object), errors='coerce')
+    return pd.Series(array, index=index)
+
+
+def extract_paths(values: Iterable[Any], paths: Dict[str, str], default: Any = 0) -> pd.DataFrame:
+    if isinstance(values, pd.Series):
+        nodes, index = values.tolist(), values.index
+    else:
+        nodes, index = list(values), None
+    levels: Dict[Tuple[str, ...], List[Any]] = {(): nodes}
+
+    columns = {}
+    for name, path in paths.items():
+        keys = tuple(path.split('.'))
+        for depth in range(1, len(keys)):
+            prefix = keys[:depth]
+            if prefix not in levels:
+                levels[prefix] = resolve_level(levels[keys[:depth - 1]], keys[depth - 1])
+
+        leaves = resolve_level(levels[keys[:-1]], keys[-1], default)
+        columns[name] = to_numeric_column(leaves, index)
+
+    return pd.DataFrame(columns, index=index)
+
+
+def extract_billing_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    if 'billing' not in df.columns and all(name in df.columns for name in BILLING_METRIC_PATHS):
+        return df[list(BILLING_METRIC_PATHS)]
+
+    billing = df['billing'] if 'billing' in df.columns else pd.Series(None, index=df.index, dtype=object)
+    return extract_paths(billing, BILLING_METRIC_PATHS)
+
+
+def to_number(value: Any) -> float:
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return float('nan')
+    return float('nan')
+
+
+def metric_values(billing: Any, paths: Dict[str, str] = BILLING_METRIC_PATHS, default: Any = 0) -> Dict[str, float]:
+    values = {}
+    for name, path in paths.items():
+        node = billing
+        for key in path.split('.'):
+            node = node.get(key, MISSING) if isinstance(node, dict) else MISSING
+        values[name] = to_number(default if node is MISSING else node)
+    return values
@@ -1,9 +1,19 @@
+import os
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, Any
-from main import MongoDBConnection
+from typing import Dict, Any, Optional
+from main import MongoDBConnection, apply_batch_size
+import bill_store
+import billing_fields
+import bucketing
 import config
-import pytz
+import creators
+import exports
+import frame_dtypes
+import ingest
+import instrumentation
+import parallel_fetch
+import rollup
 
 
 def get_week_start(date: datetime) -> datetime:
@@ -13,6 +23,9 @@ def get_week_start(date: datetime) -> datetime:
 
 
 def fetch_bills(connection: MongoDBConnection) -> pd.DataFrame:
+    if config.BILL_STORE_DIR:
+        return bill_store.fetch_bills(connection)
+    
     collection = connection.get_collection("bills", "utility_bills")
     
     query = {
@@ -31,7 +44,14 @@ def fetch_bills(connection: MongoDBConnection) -> pd.DataFrame:
         "billing.annual_consumption.cost.to_date": 1
     }
     
-    cursor = collection.find(query, projection)
+    if parallel_fetch.enabled():
+        return parallel_fetch.fetch_partitioned(connection, "bills", "utility_bills", query, projection,
+                                                ingest.fields_for_projection(projection))
+    
+    cursor = apply_batch_size(collection.find(query, projection))
+    if config.STREAM_BATCH_SIZE:
+        return ingest.stream_to_frame(cursor, ingest.fields_for_projection(projection), config.STREAM_BATCH_SIZE)
+    
     data = list(cursor)
     
     return pd.DataFrame(data)
@@ -49,35 +69,29 @@ def normalize_creator(created_by: str) -> str:
     return "agents"
 
 
-def process_bills_data(df: pd.DataFrame) -> pd.DataFrame:
+def process_bills_data(df: pd.DataFrame, identities: Optional[Dict[str, str]] = None) -> pd.DataFrame:
     if df.empty:
         return pd.DataFrame()
     
     df = df.copy()
     
     df['created_at'] = pd.to_datetime(df['created_at'])
-    df['week_start'] = df['created_at'].apply(get_week_start)
-    df['week_number'] = df['week_start'].apply(lambda x: x.isocalendar()[1])
+    buckets = bucketing.assign_buckets(df['created_at'])
+    df['day_start'] = buckets['day_start']
+    df['week_start'] = buckets['week_start']
+    df['week_number'] = buckets['week_number']
     
-    df['bill_amount'] = df['billing'].apply(
-        lambda x: x.get('current_bill_consumption', {}).get('total_amount', 0) if isinstance(x, dict) else 0
-    )
-    
-    df['annual_kwh'] = df['billing'].apply(
-        lambda x: x.get('annual_consumption', {}).get('total', 0) if isinstance(x, dict) else 0
-    )
-    
-    df['annual_cost'] = df['billing'].apply(
-        lambda x: x.get('annual_consumption', {}).get('cost', {}).get('previous_year_annual_cost', 0) 
-        if isinstance(x, dict) and isinstance(x.get('annual_consumption', {}), dict) 
-        and isinstance(x.get('annual_consumption', {}).get('cost', {}), dict) else 0
-    )
+    metrics = billing_fields.extract_billing_metrics(df)
+    df['bill_amount'] = metrics['bill_amount']
+    df['annual_kwh'] = metrics['annual_kwh']
+    df['annual_cost'] = metrics['annual_cost']
     
     df['vendor_name'] = df['vendor_name'].fillna('Unknown')
-    df['created_by'] = df['created_by'].fillna('Unknown')
-    df['creator_normalized'] = df['created_by'].apply(normalize_creator)
+    df['created_by'] = frame_dtypes.to_category(df['created_by'].fillna('Unknown'))
+    df['creator_normalized'] = creators.normalize_creators(df['created_by'], identities)
+    df = frame_dtypes.compact_bills(df)
     
-    return df[['week_start', 'week_number', 'created_at', 'created_by', 'creator_normalized', 'vendor_name', 
+    return df[['day_start', 'week_start', 'week_number', 'created_at', 'created_by', 'creator_normalized', 'vendor_name', 
                'bill_amount', 'annual_kwh', 'annual_cost']]
 
 
@@ -85,7 +99,7 @@ def aggregate_by_week(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return pd.DataFrame()
     
-    grouped = df.groupby(['week_start', 'week_number', 'vendor_name', 'created_by']).agg({
+    grouped = df.groupby(['week_start', 'week_number', 'vendor_name', 'created_by'], observed=True).agg({
         'created_at': 'count',
         'bill_amount': 'sum',
         'annual_kwh': 'sum',
@@ -102,7 +116,50 @@ def aggregate_by_week(df: pd.DataFrame) -> pd.DataFrame:
     return grouped.sort_values('week_start', ascending=False)
 
 
-def print_summary(df: pd.DataFrame, processed_df: pd.DataFrame) -> None:
+def aggregate_rollup_by_week(rollup_df: pd.DataFrame) -> pd.DataFrame:
+    if rollup_df.empty:
+        return pd.DataFrame()
+    
+    df = pd.concat([rollup_df, bucketing.week_buckets(rollup_df['day_start'])], axis=1)
+    
+    grouped = df.groupby(['week_start', 'week_number', 'vendor_name', 'created_by']).agg({
+        'bills_count': 'sum',
+        'bill_amount': 'sum',
+        'annual_kwh': 'sum',
+        'annual_cost': 'sum'
+    }).reset_index()
+    
+    grouped.columns = ['week_start', 'week_number', 'vendor_name', 'created_by', 
+                      'bills_count', 'total_bill_amount', 
+                      'total_annual_kwh', 'total_annual_cost']
+    
+    grouped['avg_annual_cost_per_bill'] = grouped['total_annual_cost'] / grouped['bills_count']
+    grouped['avg_bill_amount'] = grouped['total_bill_amount'] / grouped['bills_count']
+    
+    return grouped.sort_values('week_start', ascending=False)
+
+
+def summarize_creators(df: pd.DataFrame, processed_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    if processed_df is not None:
+        return processed_df.groupby(['week_start', 'creator_normalized'], observed=True).agg({
+            'created_at': 'count',
+            'bill_amount': 'sum',
+            'annual_kwh': 'sum',
+            'annual_cost': 'sum'
+        })
+    
+    normalized = creators.normalize_creators(df['created_by']).astype(object).rename('creator_normalized')
+    summary = df.groupby([df['week_start'], normalized], observed=True).agg({
+        'bills_count': 'sum',
+        'total_bill_amount': 'sum',
+        'total_annual_kwh': 'sum',
+        'total_annual_cost': 'sum'
+    })
+    summary.columns = ['created_at', 'bill_amount', 'annual_kwh', 'annual_cost']
+    return summary
+
+
+def print_summary(df: pd.DataFrame, processed_df: Optional[pd.DataFrame] = None) -> None:
     if df.empty:
         print("No bills found.")
         return
@@ -111,89 +168,139 @@ def print_summary(df: pd.DataFrame, processed_df: pd.DataFrame) -> None:
     print("BILLS ANALYSIS BY WEEK")
     print("="*80)
     
-    for week in df['week_start'].unique():
-        week_data = df[df['week_start'] == week]
-        week_number = week_data.iloc[0]['week_number'] if 'week_number' in week_data.columns else week.isocalendar()[1]
-        week_total = week_data.groupby('week_start').agg({
-            'bills_count': 'sum',
-            'total_bill_amount': 'sum',
-            'total_annual_kwh': 'sum',
-            'total_annual_cost': 'sum'
-        }).iloc[0]
+    weeks = df.groupby('week_start', sort=False)
+    week_totals = weeks.agg({
+        'bills_count': 'sum',
+        'total_bill_amount': 'sum',
+        'total_annual_kwh': 'sum',
+        'total_annual_cost': 'sum'
+    })
+    creator_summaries = {
+        week: summary.droplevel('week_start').sort_values('created_at', ascending=False)
+        for week, summary in summarize_creators(df, processed_df).groupby(level='week_start', sort=False)
+    }
+    
+    columns = {column: df[column].to_numpy(dtype=object) for column in 
+               ['vendor_name', 'created_by', 'bills_count', 'total_bill_amount', 'total_annual_kwh', 'avg_annual_cost_per_bill']}
+    week_numbers = df['week_number'].to_numpy() if 'week_number' in df.columns else None
+    
+    for week, positions in weeks.indices.items():
+        week_number = week_numbers[positions[0]] if week_numbers is not None else week.isocalendar()[1]
+        week_total = week_totals.loc[week]
+        creator_summary = creator_summaries.get(week, pd.DataFrame(columns=['created_at', 'bill_amount', 'annual_kwh', 'annual_cost']))
         
-        week_processed = processed_df[processed_df['week_start'] == week]
-        creator_summary = week_processed.groupby('creator_normalized').agg({
-            'created_at': 'count',
-            'bill_amount': 'sum',
-            'annual_kwh': 'sum',
-            'annual_cost': 'sum'
-        }).sort_values('created_at', ascending=False)
+        lines = [
+            f"\nWeek {week_number}",
+            "-" * 80,
+            f"Total Bills: {int(week_total['bills_count'])}",
+            f"Total Bill Amount: €{week_total['total_bill_amount']:,.2f}",
+            f"Total Annual kWh: {week_total['total_annual_kwh']:,.0f} kWh",
+            f"Total Annual Cost: €{week_total['total_annual_cost']:,.2f}",
+            f"Average Annual Cost per Bill: €{week_total['total_annual_cost']/week_total['bills_count']:,.2f}",
+            "\nSummary by Creator:"
+        ]
         
-        print(f"\nWeek {week_number}")
-        print("-" * 80)
-        print(f"Total Bills: {int(week_total['bills_count'])}")
-        print(f"Total Bill Amount: €{week_total['total_bill_amount']:,.2f}")
-        print(f"Total Annual kWh: {week_total['total_annual_kwh']:,.0f} kWh")
-        print(f"Total Annual Cost: €{week_total['total_annual_cost']:,.2f}")
-        print(f"Average Annual Cost per Bill: €{week_total['total_annual_cost']/week_total['bills_count']:,.2f}")
+        for creator, bills, amount, kwh, cost in zip(creator_summary.index, creator_summary['created_at'],
+                                                     creator_summary['bill_amount'], creator_summary['annual_kwh'],
+                                                     creator_summary['annual_cost']):
+            lines.append(f"  {creator:<40} | Bills: {int(bills):<5} | "
+                         f"€{amount:>10,.2f} | "
+                         f"{kwh:>10,.0f} kWh | "
+                         f"€{cost:>10,.2f}")
         
-        print("\nSummary by Creator:")
-        for creator, row in creator_summary.iterrows():
-            print(f"  {creator:<40} | Bills: {int(row['created_at']):<5} | "
-                  f"€{row['bill_amount']:>10,.2f} | "
-                  f"{row['annual_kwh']:>10,.0f} kWh | "
-                  f"€{row['annual_cost']:>10,.2f}")
+        lines.append("\nBy Vendor and Creator:")
+        for vendor, creator, bills, amount, kwh, avg_cost in zip(*(values[positions] for values in columns.values())):
+            lines.append(f"  {vendor:<30} | {creator:<30} | "
+                         f"Bills: {int(bills):<5} | "
+                         f"€{amount:>10,.2f} | "
+                         f"{kwh:>10,.0f} kWh | "
+                         f"€{avg_cost:>10,.2f}/bill")
         
-        print("\nBy Vendor and Creator:")
-        for _, row in week_data.iterrows():
-            print(f"  {row['vendor_name']:<30} | {row['created_by']:<30} | "
-                  f"Bills: {int(row['bills_count']):<5} | "
-                  f"€{row['total_bill_amount']:>10,.2f} | "
-                  f"{row['total_annual_kwh']:>10,.0f} kWh | "
-                  f"€{row['avg_annual_cost_per_bill']:>10,.2f}/bill")
+        print("\n".join(lines))
 
 
-def export_to_csv(df: pd.DataFrame, filename: str = "bills_analysis.csv") -> None:
-    df.to_csv(filename, index=False)
+def export_to_csv(df: pd.DataFrame, filename: str = "bills_analysis.csv", float_format: Optional[str] = config.CSV_FLOAT_FORMAT) -> None:
+    df.to_csv(filename, index=False, float_format=float_format)
     print(f"\nData exported to {filename}")
 
 
+def export_analysis(df: pd.DataFrame, formats: str = config.EXPORT_FORMATS) -> None:
+    for fmt in exports.export_formats(formats):
+        if fmt == "csv":
+            export_to_csv(df)
+        else:
+            exports.export_partitioned(df, os.path.join(config.EXPORT_DIR, fmt), fmt, config.EXPORT_MODE)
+
+
 def main():
     connection = MongoDBConnection()
+    recorder = instrumentation.RunRecorder("bills_analysis").start()
+    error = None
     
     try:
         print("Connecting to MongoDB...")
-        connection.connect()
-        
-        print("Fetching bills data...")
-        raw_df = fetch_bills(connection)
-        
-        if raw_df.empty:
-            print("No bills found in the database.")
-            return
-        
-        print(f"Found {len(raw_df)} bills")
-        
-        print("Processing data...")
-        processed_df = process_bills_data(raw_df)
-        
-        print("Aggregating by week...")
-        aggregated_df = aggregate_by_week(processed_df)
+        with recorder.stage("connect"):
+            connection.connect()
         
-        print_summary(aggregated_df, processed_df)
+        if config.STATS_MODE == "rollup":
+            with recorder.stage("fetch") as stage:
+                rollup.refresh_rollup(connection)
+                
+                print("Reading daily rollup...")
+                rollup_df = rollup.read_rollup(connection)
+                stage["rows_out"] = len(rollup_df)
+            
+            if rollup_df.empty:
+                print("No bills found in the daily rollup.")
+                return
+            
+            print("Aggregating by week...")
+            with recorder.stage("aggregate", rows_in=len(rollup_df)) as stage:
+                aggregated_df = aggregate_rollup_by_week(rollup_df)
+                stage["rows_out"] = len(aggregated_df)
+            
+            with recorder.stage("render", rows_in=len(aggregated_df)):
+                print_summary(aggregated_df)
+        else:
+            print("Fetching bills data...")
+            with recorder.stage("fetch") as stage:
+                raw_df = fetch_bills(connection)
+                stage["rows_out"] = len(raw_df)
+            
+            if raw_df.empty:
+                print("No bills found in the database.")
+                return
+            
+            print(f"Found {len(raw_df)} bills")
+            
+            print("Processing data...")
+            with recorder.stage("process", rows_in=len(raw_df)) as stage:
+                processed_df = process_bills_data(raw_df, creators.lookup_identities(connection, raw_df))
+                stage["rows_out"] = len(processed_df)
+            
+            print("Aggregating by week...")
+            with recorder.stage("aggregate", rows_in=len(processed_df)) as stage:
+                aggregated_df = aggregate_by_week(processed_df)
+                stage["rows_out"] = len(aggregated_df)
+            
+            with recorder.stage("render", rows_in=len(aggregated_df)):
+                print_summary(aggregated_df, processed_df)
         
-        export_to_csv(aggregated_df)
+        with recorder.stage("export", rows_in=len(aggregated_df)):
+            export_analysis(aggregated_df)
         
         print("\n" + "="*80)
         print("Analysis complete!")
         print("="*80)
         
     except Exception as e:
+        error = e
         print(f"Error: {e}")
         import traceback
         traceback.print_exc()
     finally:
         connection.disconnect()
+        recorder.finish(error)
 
 
 if __name__ == "__main__":
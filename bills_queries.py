@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import billing_fields
+import config
+
+
+BILLS_DATABASE = "bills"
+BILLS_COLLECTION = "utility_bills"
+
+METRIC_PATHS = {
+    name: f"$billing.{path}" for name, path in billing_fields.BILLING_METRIC_PATHS.items()
+}
+
+CREATOR_NORMALIZED_EXPR = {
+    "$cond": [
+        {"$gte": [{"$indexOfCP": [{"$toString": {"$ifNull": ["$created_by", ""]}}, "@"]}, 0]},
+        "$created_by",
+        "agents"
+    ]
+}
+
+
+def base_match() -> Dict[str, Any]:
+    return {
+        "is_archived": False,
+        "created_by": {"$nin": config.EXCLUDED_USER_IDS}
+    }
+
+
+def window_match(start: datetime, end: datetime) -> Dict[str, Any]:
+    match = base_match()
+    match["created_at"] = {"$gte": start, "$lt": end}
+    return match
+
+
+def metric_sums() -> Dict[str, Any]:
+    return {name: {"$sum": {"$ifNull": [path, 0]}} for name, path in METRIC_PATHS.items()}
+
+
+def period_totals_pipeline(start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    return [
+        {"$match": window_match(start, end)},
+        {"$group": {"_id": None, "bills_count": {"$sum": 1}, **metric_sums()}}
+    ]
+
+
+def breakdown_stage(key_expr: Any) -> List[Dict[str, Any]]:
+    return [
+        {"$group": {"_id": key_expr, "bills_count": {"$sum": 1}, **metric_sums()}},
+        {"$sort": {"bills_count": -1, "_id": 1}}
+    ]
+
+
+def period_group_pipeline(start: datetime, end: datetime, key_expr: Any, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    pipeline = [{"$match": window_match(start, end)}, *breakdown_stage(key_expr)]
+    if limit:
+        pipeline.append({"$limit": limit})
+    return pipeline
+
+
+def vendor_key() -> Dict[str, Any]:
+    return {"$ifNull": ["$vendor_name", "Unknown"]}
+
+
+def creator_key() -> Dict[str, Any]:
+    return {"$ifNull": ["$created_by", "Unknown"]}
+
+
+def period_breakdown_pipeline(start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    return [
+        {"$match": window_match(start, end)},
+        {"$facet": {
+            "totals": [{"$group": {"_id": None, "bills_count": {"$sum": 1}, **metric_sums()}}],
+            "vendors": breakdown_stage(vendor_key()),
+            "creators": breakdown_stage(creator_key())
+        }}
+    ]
+
+
+def totals_to_stats(totals: List[Dict[str, Any]]) -> dict:
+    row = totals[0] if totals else {}
+    bills_count = row.get('bills_count', 0)
+    total_annual_cost = row.get('annual_cost', 0)
+
+    return {
+        'bills_count': bills_count,
+        'total_bill_amount': row.get('bill_amount', 0),
+        'total_annual_kwh': row.get('annual_kwh', 0),
+        'total_annual_cost': total_annual_cost,
+        'avg_annual_cost_per_bill': total_annual_cost / bills_count if bills_count > 0 else 0
+    }
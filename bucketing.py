@@ -0,0 +1,46 @@
+import pandas as pd
+from datetime import datetime
+from typing import Tuple
+import config
+
+
+def local_now(timezone: str = config.REPORT_TIMEZONE) -> datetime:
+    return pd.Timestamp.now(tz=timezone).tz_localize(None).to_pydatetime()
+
+
+def to_local_time(created_at: pd.Series, timezone: str = config.REPORT_TIMEZONE) -> pd.Series:
+    timestamps = pd.to_datetime(created_at)
+    if timestamps.dt.tz is None:
+        timestamps = timestamps.dt.tz_localize('UTC')
+    return timestamps.dt.tz_convert(timezone)
+
+
+def week_buckets(day_start: pd.Series) -> pd.DataFrame:
+    week_start = day_start - pd.to_timedelta(day_start.dt.weekday, unit='D')
+    iso = week_start.dt.isocalendar()
+
+    return pd.DataFrame({
+        'week_start': week_start,
+        'iso_year': iso['year'].astype('int64'),
+        'week_number': iso['week'].astype('int64')
+    }, index=day_start.index)
+
+
+def assign_buckets(created_at: pd.Series, timezone: str = config.REPORT_TIMEZONE) -> pd.DataFrame:
+    day_start = to_local_time(created_at, timezone).dt.tz_localize(None).dt.normalize()
+    buckets = week_buckets(day_start)
+    buckets.insert(0, 'day_start', day_start)
+    return buckets
+
+
+def utc_window(start: datetime, end: datetime, timezone: str = config.REPORT_TIMEZONE) -> Tuple[datetime, datetime]:
+    bounds = pd.DatetimeIndex([start, end]).tz_localize(timezone, ambiguous=[True, True], nonexistent='shift_forward')
+    utc_bounds = bounds.tz_convert('UTC').tz_localize(None)
+    return utc_bounds[0].to_pydatetime(), utc_bounds[1].to_pydatetime()
+
+
+def local_day(created_at: datetime, timezone: str = config.REPORT_TIMEZONE) -> datetime:
+    timestamp = pd.Timestamp(created_at)
+    if timestamp.tz is None:
+        timestamp = timestamp.tz_localize('UTC')
+    return timestamp.tz_convert(timezone).tz_localize(None).normalize().to_pydatetime()
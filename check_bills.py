@@ -1,46 +1,166 @@
+import argparse
+import json
+import time
+from typing import Any, Dict, List
 from main import MongoDBConnection
-from collections import Counter
-
-connection = MongoDBConnection()
-
-try:
-    connection.connect()
-    collection = connection.get_collection("bills", "utility_bills")
-    
-    total_count = collection.count_documents({})
-    print(f"Total bills in collection: {total_count}")
-    
-    status_counts = {}
-    archived_counts = {}
-    
-    for doc in collection.find({}, {"status": 1, "is_archived": 1}):
-        status = doc.get("status", "missing")
-        archived = doc.get("is_archived", "missing")
-        
-        status_counts[status] = status_counts.get(status, 0) + 1
-        archived_counts[archived] = archived_counts.get(archived, 0) + 1
-    
+import bills_queries
+import config
+
+
+PUBLISHED_STATUS = "published"
+UNKNOWN_VENDORS = ["Unknown", ""]
+
+
+def field_value(path: str) -> Dict[str, Any]:
+    return {"$ifNull": [path, "missing"]}
+
+
+def is_missing(path: str) -> Dict[str, Any]:
+    return {"$eq": [{"$ifNull": [path, None]}, None]}
+
+
+def count_if(condition: Dict[str, Any]) -> Dict[str, Any]:
+    return {"$sum": {"$cond": [condition, 1, 0]}}
+
+
+def distribution(path: str) -> List[Dict[str, Any]]:
+    return [
+        {"$group": {"_id": field_value(path), "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}}
+    ]
+
+
+def check_counters() -> Dict[str, Any]:
+    checks = {
+        "_id": None,
+        "total": {"$sum": 1},
+        "missing_created_at": count_if(is_missing("$created_at")),
+        "invalid_created_at": count_if({"$not": [{"$in": [{"$type": "$created_at"}, ["date", "missing", "null"]]}]}),
+        "missing_billing": count_if(is_missing("$billing")),
+        "unknown_vendor": count_if({"$in": [bills_queries.vendor_key(), UNKNOWN_VENDORS]}),
+        "excluded_users": count_if({"$in": ["$created_by", config.EXCLUDED_USER_IDS]}),
+        "published_not_archived": count_if({"$and": [
+            {"$eq": ["$status", PUBLISHED_STATUS]},
+            {"$eq": ["$is_archived", False]}
+        ]}),
+        "counted": count_if({"$and": [
+            {"$eq": ["$is_archived", False]},
+            {"$not": [{"$in": ["$created_by", config.EXCLUDED_USER_IDS]}]}
+        ]})
+    }
+    for name, path in bills_queries.METRIC_PATHS.items():
+        checks[f"missing_{name}"] = count_if(is_missing(path))
+        checks[f"zero_{name}"] = count_if({"$eq": [path, 0]})
+    return checks
+
+
+def audit_pipeline() -> List[Dict[str, Any]]:
+    return [
+        {"$facet": {
+            "checks": [{"$group": check_counters()}],
+            "status": distribution("$status"),
+            "is_archived": distribution("$is_archived"),
+            "excluded_users": [
+                {"$match": {"created_by": {"$in": config.EXCLUDED_USER_IDS}}},
+                {"$group": {"_id": "$created_by", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}}
+            ]
+        }}
+    ]
+
+
+def facet_to_result(facet: Dict[str, Any]) -> Dict[str, Any]:
+    checks = facet["checks"][0] if facet["checks"] else {"total": 0}
+    checks.pop("_id", None)
+    total = checks.pop("total")
+
+    billing = {name: {"missing": checks.pop(f"missing_{name}", 0), "zero": checks.pop(f"zero_{name}", 0)}
+               for name in bills_queries.METRIC_PATHS}
+
+    return {
+        "total": total,
+        "status": [{"value": row["_id"], "count": row["count"]} for row in facet["status"]],
+        "is_archived": [{"value": row["_id"], "count": row["count"]} for row in facet["is_archived"]],
+        "checks": {
+            "missing_created_at": checks.get("missing_created_at", 0),
+            "invalid_created_at": checks.get("invalid_created_at", 0),
+            "missing_billing": checks.get("missing_billing", 0),
+            "billing": billing,
+            "unknown_vendor": checks.get("unknown_vendor", 0),
+            "excluded_users": checks.get("excluded_users", 0),
+            "published_not_archived": checks.get("published_not_archived", 0),
+            "counted": checks.get("counted", 0)
+        },
+        "excluded_users": {row["_id"]: row["count"] for row in facet["excluded_users"]}
+    }
+
+
+def audit_bills(collection) -> Dict[str, Any]:
+    start = time.perf_counter()
+    facet = next(collection.aggregate(audit_pipeline(), allowDiskUse=True), None)
+    result = facet_to_result(facet or {"checks": [], "status": [], "is_archived": [], "excluded_users": []})
+    result["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def print_audit(result: Dict[str, Any]) -> None:
+    total = result["total"]
+    checks = result["checks"]
+
+    def share(count: int) -> str:
+        return f"{count} ({count / total:.1%})" if total else str(count)
+
+    print(f"Total bills in collection: {total}")
+
     print("\nStatus distribution:")
-    for status, count in sorted(status_counts.items()):
-        print(f"  {status}: {count}")
-    
+    for row in result["status"]:
+        print(f"  {row['value']}: {row['count']}")
+
     print("\nArchived distribution:")
-    for archived, count in sorted(archived_counts.items()):
-        print(f"  {archived}: {count}")
-    
-    published_not_archived = collection.count_documents({
-        "status": "published",
-        "is_archived": False
-    })
-    print(f"\nBills with status='published' AND is_archived=False: {published_not_archived}")
-    
-    has_created_at = collection.count_documents({"created_at": {"$exists": True}})
-    print(f"\nBills with created_at field: {has_created_at}")
-    
-except Exception as e:
-    print(f"Error: {e}")
-    import traceback
-    traceback.print_exc()
-finally:
-    connection.disconnect()
+    for row in result["is_archived"]:
+        print(f"  {row['value']}: {row['count']}")
+
+    print(f"\nBills with status='{PUBLISHED_STATUS}' AND is_archived=False: {checks['published_not_archived']}")
+    print(f"Bills counted in reports (not archived, not excluded): {checks['counted']}")
+
+    print("\nData quality checks:")
+    print(f"  Missing created_at: {share(checks['missing_created_at'])}")
+    print(f"  created_at not a date: {share(checks['invalid_created_at'])}")
+    print(f"  Missing billing: {share(checks['missing_billing'])}")
+    for name, counts in checks["billing"].items():
+        print(f"  {name}: {share(counts['missing'])} missing, {share(counts['zero'])} zero")
+    print(f"  Unknown vendor: {share(checks['unknown_vendor'])}")
+    print(f"  Created by excluded users: {share(checks['excluded_users'])}")
+    for user_id, count in result["excluded_users"].items():
+        print(f"    {user_id}: {count}")
+
+    print(f"\nAudit took {result['elapsed_seconds']:.2f}s in one aggregation")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit utility_bills data quality in a single aggregation")
+    parser.add_argument("--json", action="store_true", help="print the audit result as JSON")
+    args = parser.parse_args()
+
+    connection = MongoDBConnection()
+
+    try:
+        connection.connect()
+        collection = connection.get_collection(bills_queries.BILLS_DATABASE, bills_queries.BILLS_COLLECTION)
+        result = audit_bills(collection)
+
+        if args.json:
+            print(json.dumps(result, indent=2, default=str))
+        else:
+            print_audit(result)
+
+    except Exception as e:
+        print(f"Error: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        connection.disconnect()
+
 
+if __name__ == "__main__":
+    main()
@@ -14,4 +14,76 @@ EXCLUDED_USER_IDS = [
 
 GLUE_WEBHOOK_URL = os.getenv("GLUE_WEBHOOK_URL", "")
 GLUE_TARGET = os.getenv("GLUE_TARGET", "")
+GLUE_TIMEOUT_SECONDS = float(os.getenv("GLUE_TIMEOUT_SECONDS", "10"))
+GLUE_MAX_RETRIES = int(os.getenv("GLUE_MAX_RETRIES", "3"))
+GLUE_BACKOFF_SECONDS = float(os.getenv("GLUE_BACKOFF_SECONDS", "1"))
+GLUE_MAX_MESSAGE_CHARS = int(os.getenv("GLUE_MAX_MESSAGE_CHARS", "8000"))
+GLUE_POOL_SIZE = int(os.getenv("GLUE_POOL_SIZE", "4"))
 
+STATS_MODE = os.getenv("STATS_MODE", "client").lower()
+ASYNC_QUERIES = os.getenv("ASYNC_QUERIES", "false").lower() == "true"
+
+BILL_STORE_DIR = os.getenv("BILL_STORE_DIR", "")
+BILL_STORE_FULL_REFRESH = os.getenv("BILL_STORE_FULL_REFRESH", "false").lower() == "true"
+BILL_STORE_WATERMARK_LAG_MINUTES = float(os.getenv("BILL_STORE_WATERMARK_LAG_MINUTES", "15"))
+ROLLUP_WATERMARK_LAG_MINUTES = float(os.getenv("ROLLUP_WATERMARK_LAG_MINUTES", "15"))
+
+REPORT_TIMEZONE = os.getenv("REPORT_TIMEZONE", "Europe/Rome")
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "0"))
+
+FETCH_PARTITIONS = int(os.getenv("FETCH_PARTITIONS", "0"))
+FETCH_PARTITION_FIELD = os.getenv("FETCH_PARTITION_FIELD", "_id")
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "0"))
+FETCH_EXECUTOR = os.getenv("FETCH_EXECUTOR", "thread").lower()
+
+QUERY_CACHE_DIR = os.getenv("QUERY_CACHE_DIR", "")
+QUERY_CACHE_TTL_MINUTES = float(os.getenv("QUERY_CACHE_TTL_MINUTES", "15"))
+QUERY_CACHE_MAX_AGE_HOURS = float(os.getenv("QUERY_CACHE_MAX_AGE_HOURS", "24"))
+QUERY_CACHE_MAX_MB = float(os.getenv("QUERY_CACHE_MAX_MB", "1024"))
+QUERY_CACHE_CHANGE_FIELD = os.getenv("QUERY_CACHE_CHANGE_FIELD", "updated_at")
+
+PROFILE_SAMPLE_SIZE = int(os.getenv("PROFILE_SAMPLE_SIZE", "0"))
+PROFILE_EXAMPLE_ROWS = int(os.getenv("PROFILE_EXAMPLE_ROWS", "5"))
+PROFILE_MAX_FIELDS = int(os.getenv("PROFILE_MAX_FIELDS", "500"))
+
+EXPORT_FORMATS = os.getenv("EXPORT_FORMATS", "csv")
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+EXPORT_MODE = os.getenv("EXPORT_MODE", "upsert").lower()
+CSV_FLOAT_FORMAT = os.getenv("CSV_FLOAT_FORMAT", "") or None
+
+RESOLVE_CREATORS = os.getenv("RESOLVE_CREATORS", "false").lower() == "true"
+USERS_COLLECTION = os.getenv("USERS_COLLECTION", "users")
+CREATOR_CACHE_PATH = os.getenv("CREATOR_CACHE_PATH", ".creator_cache.json")
+CREATOR_CACHE_TTL_HOURS = float(os.getenv("CREATOR_CACHE_TTL_HOURS", "24"))
+CREATOR_CACHE_MAX_ENTRIES = int(os.getenv("CREATOR_CACHE_MAX_ENTRIES", "10000"))
+
+RUN_RECORD_DIR = os.getenv("RUN_RECORD_DIR", "run_records")
+RUN_PROFILERS = os.getenv("RUN_PROFILERS", "")
+
+LIVE_METRICS_STATE_PATH = os.getenv("LIVE_METRICS_STATE_PATH", ".live_metrics.json")
+LIVE_METRICS_DAYS = int(os.getenv("LIVE_METRICS_DAYS", "2"))
+LIVE_METRICS_CHECKPOINT_SECONDS = float(os.getenv("LIVE_METRICS_CHECKPOINT_SECONDS", "30"))
+LIVE_METRICS_STATUS_SECONDS = float(os.getenv("LIVE_METRICS_STATUS_SECONDS", "60"))
+
+SCAN_CONCURRENCY = int(os.getenv("SCAN_CONCURRENCY", "8"))
+
+SCAN_COUNT_MODE = os.getenv("SCAN_COUNT_MODE", "exact").lower()
+SCAN_SAMPLE_SIZE = int(os.getenv("SCAN_SAMPLE_SIZE", "1000"))
+SCAN_PROBE_TIMEOUT_MS = int(os.getenv("SCAN_PROBE_TIMEOUT_MS", "2000"))
+SCAN_REPORT_FORMAT = os.getenv("SCAN_REPORT_FORMAT", "markdown").lower()
+
+
+def _optional_int(name: str):
+    value = os.getenv(name, "")
+    return int(value) if value else None
+
+
+MONGODB_MAX_POOL_SIZE = _optional_int("MONGODB_MAX_POOL_SIZE")
+MONGODB_MIN_POOL_SIZE = _optional_int("MONGODB_MIN_POOL_SIZE")
+MONGODB_COMPRESSORS = os.getenv("MONGODB_COMPRESSORS", "") or None
+MONGODB_READ_PREFERENCE = os.getenv("MONGODB_READ_PREFERENCE", "") or None
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = _optional_int("MONGODB_SERVER_SELECTION_TIMEOUT_MS")
+MONGODB_SOCKET_TIMEOUT_MS = _optional_int("MONGODB_SOCKET_TIMEOUT_MS")
+MONGODB_BATCH_SIZE = _optional_int("MONGODB_BATCH_SIZE")
+MONGODB_SHARED_CLIENT = os.getenv("MONGODB_SHARED_CLIENT", "true").lower() == "true"
@@ -0,0 +1,157 @@
+import json
+import os
+import time
+import pandas as pd
+from bson import ObjectId
+from typing import Dict, Iterable, List, Optional
+from main import MongoDBConnection
+import bills_queries
+import config
+
+
+AGENTS = "agents"
+
+USER_PROJECTION = {
+    "email": 1,
+    "personal.first_name": 1,
+    "personal.last_name": 1,
+    "company.company_name": 1
+}
+
+
+def is_email_mask(values: pd.Series) -> pd.Series:
+    return values.astype(object).str.contains("@", regex=False, na=False).astype(bool)
+
+
+def object_id_strings(values: Iterable) -> List[str]:
+    return sorted({value for value in values if isinstance(value, str) and ObjectId.is_valid(value)})
+
+
+def user_identity(user: dict) -> Optional[str]:
+    if user.get("email"):
+        return user["email"]
+
+    personal = user.get("personal") or {}
+    name = " ".join(part for part in (personal.get("first_name"), personal.get("last_name")) if part)
+    if name:
+        return name
+
+    company = user.get("company") or {}
+    return company.get("company_name") or None
+
+
+class CreatorCache:
+    def __init__(self, path: str = config.CREATOR_CACHE_PATH, ttl_seconds: float = config.CREATOR_CACHE_TTL_HOURS * 3600,
+                 max_entries: int = config.CREATOR_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = self.load()
+
+    def load(self) -> Dict[str, dict]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, creator_ids: List[str]) -> Dict[str, Optional[str]]:
+        now = time.time()
+        found = {}
+        for creator_id in creator_ids:
+            entry = self.entries.get(creator_id)
+            if entry and now - entry["resolved_at"] < self.ttl_seconds:
+                entry["used_at"] = now
+                found[creator_id] = entry["identity"]
+        return found
+
+    def put(self, identities: Dict[str, Optional[str]]) -> None:
+        now = time.time()
+        for creator_id, identity in identities.items():
+            self.entries[creator_id] = {"identity": identity, "resolved_at": now, "used_at": now}
+
+    def save(self) -> None:
+        if not self.path:
+            return
+
+        if len(self.entries) > self.max_entries:
+            recent = sorted(self.entries.items(), key=lambda item: item[1]["used_at"], reverse=True)
+            self.entries = dict(recent[:self.max_entries])
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+
+def fetch_identities(connection: MongoDBConnection, creator_ids: List[str]) -> Dict[str, Optional[str]]:
+    users = connection.get_collection(bills_queries.BILLS_DATABASE, config.USERS_COLLECTION)
+    identities = {creator_id: None for creator_id in creator_ids}
+    query = {"_id": {"$in": [ObjectId(creator_id) for creator_id in creator_ids]}}
+    for user in users.find(query, USER_PROJECTION):
+        identities[str(user["_id"])] = user_identity(user)
+    return identities
+
+
+def resolve_creators(connection: MongoDBConnection, created_by: pd.Series,
+                     cache: Optional[CreatorCache] = None) -> Dict[str, str]:
+    cache = cache or CreatorCache()
+    creator_ids = object_id_strings(created_by.dropna().unique())
+
+    identities = cache.get(creator_ids)
+    missing = [creator_id for creator_id in creator_ids if creator_id not in identities]
+
+    if missing:
+        try:
+            fetched = fetch_identities(connection, missing)
+        except Exception as e:
+            print(f"Could not resolve creators from {config.USERS_COLLECTION}: {e}")
+            fetched = {}
+        cache.put(fetched)
+        identities.update(fetched)
+
+    cache.save()
+
+    resolved = {creator_id: identity for creator_id, identity in identities.items() if identity}
+    print(f"Resolved {len(resolved)} of {len(creator_ids)} creator IDs "
+          f"({len(creator_ids) - len(missing)} cached, {len(missing)} looked up)")
+    return resolved
+
+
+def normalize_creators(created_by: pd.Series, identities: Optional[Dict[str, str]] = None) -> pd.Series:
+    uniques = pd.Series(created_by.dropna().unique()).astype(object)
+
+    normalized = pd.Series(AGENTS, index=uniques.index, dtype=object)
+    emails = is_email_mask(uniques)
+    normalized[emails] = uniques[emails]
+    if identities:
+        resolved = uniques.map(identities)
+        normalized = normalized.where(resolved.isna(), resolved)
+
+    normalized_by_creator = created_by.map(dict(zip(uniques, normalized)))
+    if normalized_by_creator.hasnans:
+        normalized_by_creator = normalized_by_creator.astype(object).fillna(AGENTS)
+    return normalized_by_creator
+
+
+def creator_breakdown(stats: pd.DataFrame, identities: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    normalized = normalize_creators(stats.index.to_series(), identities)
+    grouped = stats.groupby(normalized.to_numpy()).sum()
+    grouped.index.name = 'creator_normalized'
+    return grouped.sort_values('created_by', ascending=False, kind='stable')
+
+
+def resolve_breakdown(connection: MongoDBConnection, stats: pd.DataFrame) -> pd.DataFrame:
+    identities = resolve_creators(connection, stats.index.to_series()) if config.RESOLVE_CREATORS else None
+    return creator_breakdown(stats, identities)
+
+
+def lookup_identities(connection: MongoDBConnection, bills: pd.DataFrame) -> Optional[Dict[str, str]]:
+    if not config.RESOLVE_CREATORS or 'created_by' not in bills.columns:
+        return None
+    return resolve_creators(connection, bills['created_by'])
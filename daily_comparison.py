@@ -1,28 +1,30 @@
 import pandas as pd
 from datetime import datetime, timedelta
-from main import MongoDBConnection
+from main import MongoDBConnection, apply_batch_size
+import async_queries
+import bill_store
+import billing_fields
+import bills_queries
+import bucketing
 import config
-import requests
-from typing import Optional
+import glue
+import ingest
+import instrumentation
+import parallel_fetch
+import periods
+import rendering
+import rollup
+from typing import Optional, TextIO
 
 
 def get_day_start(date: datetime) -> datetime:
     return date.replace(hour=0, minute=0, second=0, microsecond=0)
 
 
-def is_email(value: str) -> bool:
-    return isinstance(value, str) and "@" in value
-
-
-def normalize_creator(created_by: str) -> str:
-    if pd.isna(created_by) or created_by == "Unknown":
-        return "agents"
-    if is_email(created_by):
-        return created_by
-    return "agents"
-
-
 def fetch_bills(connection: MongoDBConnection) -> pd.DataFrame:
+    if config.BILL_STORE_DIR:
+        return bill_store.fetch_bills(connection)
+    
     collection = connection.get_collection("bills", "utility_bills")
     
     query = {
@@ -38,7 +40,14 @@ def fetch_bills(connection: MongoDBConnection) -> pd.DataFrame:
         "billing.annual_consumption.cost.previous_year_annual_cost": 1
     }
     
-    cursor = collection.find(query, projection)
+    if parallel_fetch.enabled():
+        return parallel_fetch.fetch_partitioned(connection, "bills", "utility_bills", query, projection,
+                                                ingest.fields_for_projection(projection))
+    
+    cursor = apply_batch_size(collection.find(query, projection))
+    if config.STREAM_BATCH_SIZE:
+        return ingest.stream_to_frame(cursor, ingest.fields_for_projection(projection), config.STREAM_BATCH_SIZE)
+    
     data = list(cursor)
     
     return pd.DataFrame(data)
@@ -51,27 +60,24 @@ def process_bills_data(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
     
     df['created_at'] = pd.to_datetime(df['created_at'])
-    df['day_start'] = df['created_at'].apply(get_day_start)
+    df['day_start'] = bucketing.assign_buckets(df['created_at'])['day_start']
     
-    df['bill_amount'] = df['billing'].apply(
-        lambda x: x.get('current_bill_consumption', {}).get('total_amount', 0) if isinstance(x, dict) else 0
-    )
+    metrics = billing_fields.extract_billing_metrics(df)
+    df['bill_amount'] = metrics['bill_amount']
+    df['annual_kwh'] = metrics['annual_kwh']
+    df['annual_cost'] = metrics['annual_cost']
     
-    df['annual_kwh'] = df['billing'].apply(
-        lambda x: x.get('annual_consumption', {}).get('total', 0) if isinstance(x, dict) else 0
-    )
-    
-    df['annual_cost'] = df['billing'].apply(
-        lambda x: x.get('annual_consumption', {}).get('cost', {}).get('previous_year_annual_cost', 0) 
-        if isinstance(x, dict) and isinstance(x.get('annual_consumption', {}), dict) 
-        and isinstance(x.get('annual_consumption', {}).get('cost', {}), dict) else 0
-    )
-    
-    return df[['day_start', 'bill_amount', 'annual_kwh', 'annual_cost']]
+    return periods.sort_by_time(df[['day_start', 'bill_amount', 'annual_kwh', 'annual_cost']])
+
+
+def get_report_days(now: datetime) -> tuple:
+    target_start = get_day_start(now - timedelta(days=1))
+    comparison_start = target_start - timedelta(days=1)
+    return target_start, comparison_start
 
 
 def get_day_stats(df: pd.DataFrame, day_start: datetime) -> dict:
-    day_data = df[df['day_start'] == day_start]
+    day_data = periods.slice_period(df, day_start, day_start + timedelta(days=1))
     
     if day_data.empty:
         return {
@@ -97,6 +103,24 @@ def get_day_stats(df: pd.DataFrame, day_start: datetime) -> dict:
     }
 
 
+def fetch_day_stats(connection: MongoDBConnection, day_start: datetime) -> dict:
+    collection = connection.get_collection(bills_queries.BILLS_DATABASE, bills_queries.BILLS_COLLECTION)
+    start, end = bucketing.utc_window(day_start, day_start + timedelta(days=1))
+    pipeline = bills_queries.period_totals_pipeline(start, end)
+    return bills_queries.totals_to_stats(list(collection.aggregate(pipeline)))
+
+
+def fetch_day_stats_concurrently(target_start: datetime, comparison_start: datetime) -> tuple:
+    pipelines = {
+        day_start.strftime('%Y-%m-%d'): bills_queries.period_totals_pipeline(
+            *bucketing.utc_window(day_start, day_start + timedelta(days=1))
+        )
+        for day_start in (target_start, comparison_start)
+    }
+    results = async_queries.run_pipelines(pipelines)
+    return tuple(bills_queries.totals_to_stats(rows) for rows in results.values())
+
+
 def format_change(current: float, previous: float, reverse: bool = False) -> str:
     if previous == 0:
         return "🟢 NEW" if current > 0 else "⚪"
@@ -117,76 +141,100 @@ def format_change(current: float, previous: float, reverse: bool = False) -> str
     return f"{emoji} {sign}{change:.1f}%"
 
 
-def generate_daily_report(target_stats: dict, comparison_stats: dict, target_day: datetime, comparison_day: datetime) -> str:
-    report = f"## 📊 Daily Bills Report\n\n"
-    report += f"**{target_day.strftime('%Y-%m-%d')}** vs **{comparison_day.strftime('%Y-%m-%d')}** (previous day)\n\n"
-    report += "---\n\n"
-    report += "### Overall Metrics\n\n"
+def write_daily_report(writer: rendering.ReportWriter, target_stats: dict, comparison_stats: dict, target_day: datetime, comparison_day: datetime) -> None:
+    writer.heading("📊 Daily Bills Report")
+    writer.paragraph(f"**{target_day.strftime('%Y-%m-%d')}** vs **{comparison_day.strftime('%Y-%m-%d')}** (previous day)")
+    writer.rule()
+    writer.heading("Overall Metrics", 3)
     
     bills_change = format_change(target_stats['bills_count'], comparison_stats['bills_count'])
-    report += f"**Bills Added:** {target_stats['bills_count']} (vs {comparison_stats['bills_count']}) {bills_change}\n\n"
+    writer.paragraph(f"**Bills Added:** {target_stats['bills_count']} (vs {comparison_stats['bills_count']}) {bills_change}")
     
     amount_change = format_change(target_stats['total_bill_amount'], comparison_stats['total_bill_amount'])
-    report += f"**Total Bill Amount:** €{target_stats['total_bill_amount']:,.2f} (vs €{comparison_stats['total_bill_amount']:,.2f}) {amount_change}\n\n"
+    writer.paragraph(f"**Total Bill Amount:** €{target_stats['total_bill_amount']:,.2f} (vs €{comparison_stats['total_bill_amount']:,.2f}) {amount_change}")
     
     kwh_change = format_change(target_stats['total_annual_kwh'], comparison_stats['total_annual_kwh'])
-    report += f"**Total Annual kWh:** {target_stats['total_annual_kwh']:,.0f} kWh (vs {comparison_stats['total_annual_kwh']:,.0f} kWh) {kwh_change}\n\n"
+    writer.paragraph(f"**Total Annual kWh:** {target_stats['total_annual_kwh']:,.0f} kWh (vs {comparison_stats['total_annual_kwh']:,.0f} kWh) {kwh_change}")
     
     cost_change = format_change(target_stats['total_annual_cost'], comparison_stats['total_annual_cost'])
-    report += f"**Total Annual Cost:** €{target_stats['total_annual_cost']:,.2f} (vs €{comparison_stats['total_annual_cost']:,.2f}) {cost_change}\n\n"
+    writer.paragraph(f"**Total Annual Cost:** €{target_stats['total_annual_cost']:,.2f} (vs €{comparison_stats['total_annual_cost']:,.2f}) {cost_change}")
     
     avg_cost_change = format_change(target_stats['avg_annual_cost_per_bill'], comparison_stats['avg_annual_cost_per_bill'])
-    report += f"**Avg Annual Cost per Bill:** €{target_stats['avg_annual_cost_per_bill']:,.2f} (vs €{comparison_stats['avg_annual_cost_per_bill']:,.2f}) {avg_cost_change}\n\n"
-    
-    return report
+    writer.paragraph(f"**Avg Annual Cost per Bill:** €{target_stats['avg_annual_cost_per_bill']:,.2f} (vs €{comparison_stats['avg_annual_cost_per_bill']:,.2f}) {avg_cost_change}")
 
 
-def send_to_glue(webhook_url: str, target: str, message: str) -> bool:
-    try:
-        response = requests.post(
-            webhook_url,
-            json={
-                "target": target,
-                "text": message
-            },
-            headers={"Content-Type": "application/json"},
-            timeout=10
-        )
-        response.raise_for_status()
-        return True
-    except Exception as e:
-        print(f"Error sending to Glue: {e}")
-        return False
+def generate_daily_report(target_stats: dict, comparison_stats: dict, target_day: datetime, comparison_day: datetime,
+                          fmt: str = "markdown", out: Optional[TextIO] = None) -> str:
+    if fmt == "json":
+        return rendering.render_data({
+            "target_day": target_day,
+            "comparison_day": comparison_day,
+            "target": target_stats,
+            "comparison": comparison_stats
+        }, out)
+    return rendering.render(
+        lambda writer: write_daily_report(writer, target_stats, comparison_stats, target_day, comparison_day),
+        fmt, "Daily Bills Report", out
+    )
 
 
 def main():
     connection = MongoDBConnection()
+    recorder = instrumentation.RunRecorder("daily_comparison").start()
+    error = None
     
     try:
         print("Connecting to MongoDB...")
-        connection.connect()
-        
-        print("Fetching bills data...")
-        raw_df = fetch_bills(connection)
-        
-        if raw_df.empty:
-            print("No bills found in the database.")
-            return
+        with recorder.stage("connect"):
+            connection.connect()
         
-        print("Processing data...")
-        processed_df = process_bills_data(raw_df)
+        target_start, comparison_start = get_report_days(bucketing.local_now())
         
-        now = datetime.now()
-        target_day = now - timedelta(days=1)
-        target_start = get_day_start(target_day)
-        comparison_start = target_start - timedelta(days=1)
-        
-        print(f"Analyzing {target_start.strftime('%Y-%m-%d')} vs {comparison_start.strftime('%Y-%m-%d')}...")
-        
-        target_stats = get_day_stats(processed_df, target_start)
-        comparison_stats = get_day_stats(processed_df, comparison_start)
+        if config.STATS_MODE == "server":
+            print(f"Aggregating {target_start.strftime('%Y-%m-%d')} vs {comparison_start.strftime('%Y-%m-%d')} in MongoDB...")
+            
+            with recorder.stage("aggregate"):
+                if config.ASYNC_QUERIES:
+                    target_stats, comparison_stats = fetch_day_stats_concurrently(target_start, comparison_start)
+                else:
+                    target_stats = fetch_day_stats(connection, target_start)
+                    comparison_stats = fetch_day_stats(connection, comparison_start)
+        elif config.STATS_MODE == "rollup":
+            with recorder.stage("fetch") as stage:
+                rollup.refresh_rollup(connection)
+                
+                target_end = target_start + timedelta(days=1)
+                rollup_df = rollup.read_rollup(connection, comparison_start, target_end)
+                stage["rows_out"] = len(rollup_df)
+            
+            print(f"Analyzing {target_start.strftime('%Y-%m-%d')} vs {comparison_start.strftime('%Y-%m-%d')} from the daily rollup...")
+            
+            with recorder.stage("aggregate", rows_in=len(rollup_df)):
+                target_stats = rollup.period_stats(rollup_df, target_start, target_end)
+                comparison_stats = rollup.period_stats(rollup_df, comparison_start, target_start)
+        else:
+            print("Fetching bills data...")
+            with recorder.stage("fetch") as stage:
+                raw_df = fetch_bills(connection)
+                stage["rows_out"] = len(raw_df)
+            
+            if raw_df.empty:
+                print("No bills found in the database.")
+                return
+            
+            print("Processing data...")
+            with recorder.stage("process", rows_in=len(raw_df)) as stage:
+                processed_df = process_bills_data(raw_df)
+                stage["rows_out"] = len(processed_df)
+            
+            print(f"Analyzing {target_start.strftime('%Y-%m-%d')} vs {comparison_start.strftime('%Y-%m-%d')}...")
+            
+            with recorder.stage("aggregate", rows_in=len(processed_df)):
+                target_stats = get_day_stats(processed_df, target_start)
+                comparison_stats = get_day_stats(processed_df, comparison_start)
         
-        report = generate_daily_report(target_stats, comparison_stats, target_start, comparison_start)
+        with recorder.stage("render"):
+            report = generate_daily_report(target_stats, comparison_stats, target_start, comparison_start)
         
         print("\n" + "="*80)
         print("DAILY COMPARISON REPORT")
@@ -199,7 +247,9 @@ def main():
         
         if webhook_url and target:
             print("\nSending to Glue...")
-            if send_to_glue(webhook_url, target, report):
+            with recorder.stage("webhook"):
+                sent = glue.send_to_glue(webhook_url, target, report)
+            if sent:
                 print("✅ Successfully sent to Glue!")
             else:
                 print("❌ Failed to send to Glue")
@@ -207,11 +257,13 @@ def main():
             print("Webhook URL or target not configured, skipping webhook")
         
     except Exception as e:
+        error = e
         print(f"Error: {e}")
         import traceback
         traceback.print_exc()
     finally:
         connection.disconnect()
+        recorder.finish(error)
 
 
 if __name__ == "__main__":
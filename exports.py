@@ -0,0 +1,125 @@
+import json
+import os
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import pandas as pd
+import config
+
+try:
+    import pyarrow
+    import pyarrow.dataset
+except ImportError:
+    pyarrow = None
+
+
+FORMATS = {"parquet": ".parquet", "feather": ".feather"}
+MODES = ["upsert", "overwrite"]
+MANIFEST_FILE = "_manifest.json"
+
+
+def require_pyarrow() -> None:
+    if pyarrow is None:
+        raise RuntimeError("Parquet and Feather exports require pyarrow (pip install pyarrow)")
+
+
+def partition_keys(week_start: pd.Series) -> pd.Series:
+    iso = pd.to_datetime(week_start).dt.isocalendar()
+    return iso['year'].astype(str) + "-W" + iso['week'].astype(str).str.zfill(2)
+
+
+def partition_hash(part: pd.DataFrame) -> str:
+    return format(int(pd.util.hash_pandas_object(part, index=False).sum()) & (2 ** 64 - 1), '016x')
+
+
+def write_partition(part: pd.DataFrame, path: str, fmt: str) -> None:
+    tmp_path = path + ".tmp"
+    if fmt == "parquet":
+        part.to_parquet(tmp_path, index=False)
+    else:
+        part.reset_index(drop=True).to_feather(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def read_partition(path: str, fmt: str) -> pd.DataFrame:
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    return pd.read_feather(path)
+
+
+def load_manifest(directory: str) -> Dict[str, Any]:
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"partitions": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(directory: str, manifest: Dict[str, Any]) -> None:
+    path = os.path.join(directory, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def export_partitioned(df: pd.DataFrame, directory: str, fmt: str = "parquet", mode: str = "upsert") -> List[str]:
+    require_pyarrow()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} (choose from {', '.join(FORMATS)})")
+    if mode not in MODES:
+        raise ValueError(f"Unknown export mode: {mode} (choose from {', '.join(MODES)})")
+
+    os.makedirs(directory, exist_ok=True)
+    manifest = load_manifest(directory)
+    if manifest.get("format") not in (None, fmt):
+        manifest = {"partitions": {}}
+    partitions = {} if mode == "overwrite" else manifest["partitions"]
+
+    written = []
+    keys = partition_keys(df['week_start'])
+    for key, part in df.groupby(keys, sort=True, observed=True):
+        part = part.reset_index(drop=True)
+        digest = partition_hash(part)
+        filename = f"week={key}{FORMATS[fmt]}"
+
+        previous = partitions.get(key)
+        if previous and previous["hash"] == digest and os.path.exists(os.path.join(directory, filename)):
+            continue
+
+        write_partition(part, os.path.join(directory, filename), fmt)
+        partitions[key] = {"file": filename, "rows": len(part), "hash": digest,
+                           "written_at": datetime.now().isoformat()}
+        written.append(key)
+
+    current_keys = set(keys.unique())
+    for key in [key for key in partitions if key not in current_keys]:
+        del partitions[key]
+
+    current = {entry["file"] for entry in partitions.values()}
+    for filename in os.listdir(directory):
+        if filename.startswith("week=") and filename not in current:
+            os.remove(os.path.join(directory, filename))
+
+    save_manifest(directory, {"format": fmt, "partitions": dict(sorted(partitions.items()))})
+
+    print(f"Exported {len(written)} of {keys.nunique()} weekly partitions to {directory} ({fmt}, {mode})")
+    return written
+
+
+def load_partitions(directory: str, weeks: Optional[List[str]] = None) -> pd.DataFrame:
+    require_pyarrow()
+    manifest = load_manifest(directory)
+    fmt = manifest.get("format", "parquet")
+    keys = sorted(manifest["partitions"]) if weeks is None else [week for week in weeks if week in manifest["partitions"]]
+
+    if not keys:
+        return pd.DataFrame()
+    if len(keys) == 1:
+        return read_partition(os.path.join(directory, manifest["partitions"][keys[0]]["file"]), fmt)
+
+    paths = [os.path.join(directory, manifest["partitions"][key]["file"]) for key in keys]
+    return pyarrow.dataset.dataset(paths, format="parquet" if fmt == "parquet" else "ipc").to_table().to_pandas()
+
+
+def export_formats(formats: str = config.EXPORT_FORMATS) -> List[str]:
+    return [fmt.strip().lower() for fmt in formats.split(",") if fmt.strip()]
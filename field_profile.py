@@ -0,0 +1,333 @@
+import hashlib
+import math
+import random
+import time
+import pandas as pd
+from bson import Decimal128, ObjectId
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import reduce
+from typing import Any, Dict, Iterable, List, Optional
+from analyze_database import wilson_interval
+from main import apply_batch_size
+import config
+import parallel_fetch
+
+
+HLL_PRECISION = 12
+SKETCH_SIZE = 256
+OTHER_FIELDS = "(other fields)"
+
+
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        if other.count:
+            count = self.count + other.count
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / count
+            self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+            self.count = count
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        return self
+
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+class QuantileSketch:
+    def __init__(self, k: int = SKETCH_SIZE):
+        self.k = k
+        self.levels: List[List[float]] = [[]]
+
+    def add(self, value: float) -> None:
+        self.levels[0].append(value)
+        if len(self.levels[0]) >= self.k:
+            self.compact()
+
+    def compact(self) -> None:
+        for height, level in enumerate(self.levels):
+            if len(level) < self.k:
+                continue
+            if height + 1 == len(self.levels):
+                self.levels.append([])
+            level.sort()
+            kept = [level.pop(random.randrange(len(level)))] if len(level) % 2 else []
+            self.levels[height + 1].extend(level[random.randint(0, 1)::2])
+            self.levels[height] = kept
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        for height, level in enumerate(other.levels):
+            if height == len(self.levels):
+                self.levels.append([])
+            self.levels[height].extend(level)
+        self.compact()
+        return self
+
+    def quantiles(self, probabilities: List[float]) -> List[float]:
+        weighted = sorted((value, 2 ** height) for height, level in enumerate(self.levels) for value in level)
+        if not weighted:
+            return [math.nan] * len(probabilities)
+
+        total = sum(weight for _, weight in weighted)
+        results = []
+        for probability in probabilities:
+            target, cumulative = probability * total, 0
+            for value, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    results.append(value)
+                    break
+        return results
+
+    def rank_error(self) -> float:
+        return 0.0 if len(self.levels) == 1 else 1.65 / math.sqrt(self.k)
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value: Any) -> None:
+        data = value.encode("utf-8") if isinstance(value, str) else repr(value).encode("utf-8")
+        hashed = int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        return self
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+
+class Reservoir:
+    def __init__(self, size: int = config.PROFILE_EXAMPLE_ROWS):
+        self.size = size
+        self.seen = 0
+        self.items: List[Any] = []
+
+    def add(self, item: Any) -> None:
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+        else:
+            slot = random.randrange(self.seen)
+            if slot < self.size:
+                self.items[slot] = item
+
+    def merge(self, other: "Reservoir") -> "Reservoir":
+        left, right = list(self.items), list(other.items)
+        left_weight, right_weight = self.seen, other.seen
+        random.shuffle(left)
+        random.shuffle(right)
+        items = []
+        while len(items) < self.size and (left or right):
+            if right and (not left or random.random() * (left_weight + right_weight) >= left_weight):
+                items.append(right.pop())
+            else:
+                items.append(left.pop())
+        self.items, self.seen = items, self.seen + other.seen
+        return self
+
+
+def type_name(value: Any) -> str:
+    if isinstance(value, ObjectId):
+        return "ObjectId (reference)"
+    return type(value).__name__
+
+
+def numeric_value(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return None if isinstance(value, float) and math.isnan(value) else float(value)
+    if isinstance(value, Decimal128):
+        return float(value.to_decimal())
+    return None
+
+
+def flatten(doc: Dict[str, Any], prefix: str = "") -> Iterable:
+    for key, value in doc.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict) and value:
+            yield from flatten(value, path)
+        else:
+            yield path, value
+
+
+class FieldProfile:
+    def __init__(self):
+        self.present = 0
+        self.nulls = 0
+        self.types: Dict[str, int] = {}
+        self.distinct = HyperLogLog()
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch()
+        self.first: Optional[datetime] = None
+        self.last: Optional[datetime] = None
+
+    def add(self, value: Any) -> None:
+        self.present += 1
+        if value is None:
+            self.nulls += 1
+            return
+
+        name = type_name(value)
+        self.types[name] = self.types.get(name, 0) + 1
+        self.distinct.add(value)
+
+        number = numeric_value(value)
+        if number is not None:
+            self.stats.add(number)
+            self.sketch.add(number)
+        elif isinstance(value, datetime):
+            self.first = value if self.first is None else min(self.first, value)
+            self.last = value if self.last is None else max(self.last, value)
+
+    def merge(self, other: "FieldProfile") -> "FieldProfile":
+        self.present += other.present
+        self.nulls += other.nulls
+        for name, count in other.types.items():
+            self.types[name] = self.types.get(name, 0) + count
+        self.distinct.merge(other.distinct)
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+        for value in (other.first, other.last):
+            if value is not None:
+                self.first = value if self.first is None else min(self.first, value)
+                self.last = value if self.last is None else max(self.last, value)
+        return self
+
+    def dtype(self) -> str:
+        if not self.types:
+            return "null"
+        names = sorted(self.types, key=lambda name: -self.types[name])
+        return names[0] if len(names) == 1 else f"mixed ({', '.join(names)})"
+
+
+class CollectionProfile:
+    def __init__(self, max_fields: int = config.PROFILE_MAX_FIELDS, example_rows: int = config.PROFILE_EXAMPLE_ROWS):
+        self.max_fields = max_fields
+        self.documents = 0
+        self.fields: Dict[str, FieldProfile] = {}
+        self.examples = Reservoir(example_rows)
+        self.population: Optional[int] = None
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        self.documents += 1
+        self.examples.add(doc)
+        for path, value in flatten(doc):
+            profile = self.fields.get(path)
+            if profile is None:
+                if len(self.fields) >= self.max_fields:
+                    path = OTHER_FIELDS
+                    profile = self.fields.get(path)
+                if profile is None:
+                    profile = self.fields[path] = FieldProfile()
+            profile.add(value)
+
+    def merge(self, other: "CollectionProfile") -> "CollectionProfile":
+        self.documents += other.documents
+        for path, profile in other.fields.items():
+            if path in self.fields:
+                self.fields[path].merge(profile)
+            else:
+                self.fields[path] = profile
+        self.examples.merge(other.examples)
+        return self
+
+    def sampled(self) -> bool:
+        return self.population is not None and self.documents < self.population
+
+    def summary(self) -> pd.DataFrame:
+        rows = []
+        correction = math.sqrt(max(0.0, 1 - self.documents / self.population)) if self.sampled() else 0.0
+        for path, profile in self.fields.items():
+            non_null = profile.present - profile.nulls
+            row = {
+                'field': path,
+                'dtype': profile.dtype(),
+                'count': non_null,
+                'null_pct': 100 * (1 - non_null / self.documents) if self.documents else 0.0,
+                'distinct': profile.distinct.estimate() if non_null else 0
+            }
+            if profile.stats.count:
+                p25, p50, p75 = profile.sketch.quantiles([0.25, 0.5, 0.75])
+                row.update({'mean': profile.stats.mean, 'std': profile.stats.std(), 'min': profile.stats.min,
+                            '25%': p25, '50%': p50, '75%': p75, 'max': profile.stats.max})
+            elif profile.first is not None:
+                row.update({'min': profile.first, 'max': profile.last})
+
+            if self.sampled():
+                low, high = wilson_interval(self.documents - non_null, self.documents)
+                row['null_pct_error'] = 100 * (high - low) / 2 * correction
+                if profile.stats.count > 1:
+                    row['mean_error'] = 1.96 * profile.stats.std() / math.sqrt(profile.stats.count) * correction
+            rows.append(row)
+
+        return pd.DataFrame(rows).set_index('field') if rows else pd.DataFrame()
+
+    def example_frame(self) -> pd.DataFrame:
+        return pd.DataFrame([dict(flatten(doc)) for doc in self.examples.items])
+
+
+def profile_cursor(cursor: Iterable[Dict[str, Any]], profile: Optional[CollectionProfile] = None) -> CollectionProfile:
+    profile = profile or CollectionProfile()
+    for doc in cursor:
+        profile.add(doc)
+    return profile
+
+
+def profile_collection(collection, query: Optional[Dict[str, Any]] = None,
+                       sample_size: int = config.PROFILE_SAMPLE_SIZE) -> CollectionProfile:
+    start = time.perf_counter()
+    query = query or {}
+
+    if sample_size:
+        pipeline = ([{"$match": query}] if query else []) + [{"$sample": {"size": sample_size}}]
+        profile = profile_cursor(collection.aggregate(pipeline))
+        profile.population = collection.count_documents(query) if query else collection.estimated_document_count()
+    elif parallel_fetch.enabled():
+        field = parallel_fetch.check_partition_field(collection, config.FETCH_PARTITION_FIELD)
+        boundaries, alias = parallel_fetch.sample_boundaries(collection, field, config.FETCH_PARTITIONS, query)
+        queries = parallel_fetch.range_queries(query, config.FETCH_PARTITION_FIELD, boundaries, alias)
+        with ThreadPoolExecutor(max_workers=config.FETCH_WORKERS or len(queries), thread_name_prefix="profile") as pool:
+            profiles = list(pool.map(lambda range_query: profile_cursor(apply_batch_size(collection.find(range_query))), queries))
+        profile = reduce(lambda merged, part: merged.merge(part), profiles, CollectionProfile())
+    else:
+        profile = profile_cursor(apply_batch_size(collection.find(query)))
+
+    elapsed = time.perf_counter() - start
+    print(f"Profiled {profile.documents:,} documents in {elapsed:.2f}s "
+          f"({profile.documents / elapsed if elapsed > 0 else 0:,.0f} docs/s)")
+    return profile
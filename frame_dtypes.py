@@ -0,0 +1,33 @@
+import pandas as pd
+from typing import List
+
+
+CATEGORY_COLUMNS = ['vendor_name', 'created_by', 'creator_normalized']
+INTEGER_COLUMNS = ['week_number', 'annual_kwh']
+
+
+def to_category(values: pd.Series) -> pd.Series:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+    return values.astype('category')
+
+
+def narrow_integers(values: pd.Series) -> pd.Series:
+    if values.dtype.kind not in 'iu':
+        return values
+    return pd.to_numeric(values, downcast='integer')
+
+
+def compact_bills(df: pd.DataFrame, category_columns: List[str] = CATEGORY_COLUMNS,
+                  integer_columns: List[str] = INTEGER_COLUMNS) -> pd.DataFrame:
+    for column in category_columns:
+        if column in df.columns:
+            df[column] = to_category(df[column])
+    for column in integer_columns:
+        if column in df.columns:
+            df[column] = narrow_integers(df[column])
+    return df
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
@@ -0,0 +1,171 @@
+import atexit
+import hashlib
+import random
+import threading
+import time
+import requests
+from concurrent.futures import Future, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional
+import config
+
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size: int = config.GLUE_POOL_SIZE) -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+            _session.headers.update({"Content-Type": "application/json"})
+        return _session
+
+
+def close_session() -> None:
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+atexit.register(close_session)
+
+
+def split_targets(target: str) -> List[str]:
+    return [name.strip() for name in target.split(",") if name.strip()]
+
+
+def split_long_block(block: str, limit: int) -> List[str]:
+    pieces = []
+    current = ""
+    for line in block.split("\n"):
+        while len(line) > limit:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:limit])
+            line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            pieces.append(current)
+            current = line
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_message(message: str, limit: int = config.GLUE_MAX_MESSAGE_CHARS) -> List[str]:
+    if len(message) <= limit:
+        return [message]
+
+    body_limit = max(1, limit - len("\n\n(part 999/999)"))
+    chunks = []
+    current = ""
+    for block in message.split("\n\n"):
+        for piece in split_long_block(block, body_limit) if len(block) > body_limit else [block]:
+            candidate = f"{current}\n\n{piece}" if current else piece
+            if len(candidate) > body_limit:
+                chunks.append(current)
+                current = piece
+            else:
+                current = candidate
+    if current:
+        chunks.append(current)
+
+    return [f"{chunk}\n\n(part {index}/{len(chunks)})" for index, chunk in enumerate(chunks, start=1)]
+
+
+def idempotency_key(target: str, message: str, part: int) -> str:
+    return hashlib.sha256(f"{target}\0{part}\0{message}".encode("utf-8")).hexdigest()
+
+
+class GlueClient:
+    def __init__(
+        self,
+        webhook_url: str = config.GLUE_WEBHOOK_URL,
+        timeout: float = config.GLUE_TIMEOUT_SECONDS,
+        max_retries: int = config.GLUE_MAX_RETRIES,
+        backoff: float = config.GLUE_BACKOFF_SECONDS,
+        max_message_chars: int = config.GLUE_MAX_MESSAGE_CHARS,
+        session: Optional[requests.Session] = None
+    ):
+        self.webhook_url = webhook_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_message_chars = max_message_chars
+        self.session = session or get_session()
+        self.executor = ThreadPoolExecutor(max_workers=config.GLUE_POOL_SIZE, thread_name_prefix="glue")
+        self.pending: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+
+    def post(self, target: str, text: str, key: str) -> bool:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(
+                    self.webhook_url,
+                    json={"target": target, "text": text},
+                    headers={"Idempotency-Key": key},
+                    timeout=self.timeout
+                )
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return True
+                error = f"HTTP {response.status_code}"
+            except (requests.Timeout, requests.ConnectionError) as e:
+                error = str(e)
+            except Exception as e:
+                print(f"Error sending to Glue ({target}): {e}")
+                return False
+
+            if attempt < self.max_retries:
+                delay = self.backoff * 2 ** attempt * (1 + random.random() / 2)
+                print(f"Glue delivery to {target} failed ({error}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
+
+        print(f"Error sending to Glue ({target}): {error} after {self.max_retries + 1} attempts")
+        return False
+
+    def deliver(self, target: str, message: str) -> bool:
+        chunks = chunk_message(message, self.max_message_chars)
+        for part, chunk in enumerate(chunks, start=1):
+            if not self.post(target, chunk, idempotency_key(target, message, part)):
+                return False
+        return True
+
+    def deliver_after(self, previous: Optional[Future], target: str, message: str) -> bool:
+        if previous is not None:
+            previous.result()
+        return self.deliver(target, message)
+
+    def submit(self, target: str, message: str) -> Future:
+        with self.lock:
+            future = self.executor.submit(self.deliver_after, self.pending.get(target), target, message)
+            self.pending[target] = future
+        return future
+
+    def send(self, targets: List[str], message: str) -> Dict[str, bool]:
+        futures = {target: self.submit(target, message) for target in targets}
+        return {target: future.result() for target, future in futures.items()}
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+def send_to_glue(webhook_url: str, target: str, message: str) -> bool:
+    client = GlueClient(webhook_url)
+    try:
+        results = client.send(split_targets(target), message)
+    finally:
+        client.close()
+    return bool(results) and all(results.values())
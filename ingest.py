@@ -0,0 +1,182 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+import billing_fields
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+DEFAULT_BATCH_SIZE = 10_000
+
+FIELD_KINDS = {
+    "created_at": "datetime",
+    "updated_at": "datetime",
+    **{f"billing.{path}": "number" for path in billing_fields.BILLING_METRIC_PATHS.values()}
+}
+
+OUTPUT_NAMES = {f"billing.{path}": name for name, path in billing_fields.BILLING_METRIC_PATHS.items()}
+
+
+class ColumnBuffer:
+    def __init__(self, capacity: int = DEFAULT_BATCH_SIZE):
+        self.capacity = capacity
+        self.data: Optional[np.ndarray] = None
+        self.size = 0
+
+    def extend(self, values: np.ndarray) -> None:
+        if self.data is None:
+            self.data = np.empty(max(self.capacity, len(values)), dtype=values.dtype)
+
+        dtype = np.promote_types(self.data.dtype, values.dtype)
+        if dtype != self.data.dtype:
+            self.data = self.data.astype(dtype)
+
+        needed = self.size + len(values)
+        if needed > len(self.data):
+            grown = np.empty(max(needed, 2 * len(self.data)), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+
+        self.data[self.size:needed] = values
+        self.size = needed
+
+    def to_array(self) -> np.ndarray:
+        if self.data is None:
+            return np.empty(0, dtype=object)
+        return self.data[:self.size]
+
+
+def object_array(values: List[Any]) -> np.ndarray:
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def convert_batch(values: List[Any], kind: str) -> np.ndarray:
+    if kind == "number":
+        return billing_fields.to_numeric_column(values, None).to_numpy()
+    if kind == "datetime":
+        return pd.to_datetime(pd.Series(object_array(values)), errors='coerce').to_numpy()
+    return object_array(values)
+
+
+def resolve_path(docs: List[Any], keys: Tuple[str, ...], default: Any) -> List[Any]:
+    nodes = docs
+    for key in keys[:-1]:
+        nodes = billing_fields.resolve_level(nodes, key)
+    return billing_fields.resolve_level(nodes, keys[-1], default)
+
+
+def fields_for_projection(projection: Dict[str, Any]) -> Dict[str, Tuple[str, str]]:
+    fields = {"_id": ("_id", "object")}
+    for path, include in projection.items():
+        if include:
+            fields[OUTPUT_NAMES.get(path, path)] = (path, FIELD_KINDS.get(path, "object"))
+    return fields
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 1024 ** 2 if sys.platform == "darwin" else max_rss / 1024
+
+
+def current_rss_mb() -> Optional[float]:
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1024 ** 2
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def iter_batches(cursor: Iterable[Dict[str, Any]], batch_size: int) -> Iterable[List[Dict[str, Any]]]:
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_fields(batches: Iterable[List[Dict[str, Any]]], fields: Dict[str, Tuple[str, str]],
+                  batch_size: int) -> Tuple[Dict[str, ColumnBuffer], int]:
+    buffers = {name: ColumnBuffer(batch_size) for name in fields}
+    split_paths = {name: tuple(path.split('.')) for name, (path, _) in fields.items()}
+    rows = 0
+
+    for batch in batches:
+        for name, (_, kind) in fields.items():
+            default = 0 if kind == "number" else None
+            values = resolve_path(batch, split_paths[name], default)
+            buffers[name].extend(convert_batch(values, kind))
+        rows += len(batch)
+
+    return buffers, rows
+
+
+def stream_documents(batches: Iterable[List[Dict[str, Any]]], batch_size: int) -> Tuple[Dict[str, ColumnBuffer], int]:
+    buffers: Dict[str, ColumnBuffer] = {}
+    rows = 0
+
+    for batch in batches:
+        keys = dict.fromkeys(key for doc in batch for key in doc)
+        for key in keys:
+            if key not in buffers:
+                buffers[key] = ColumnBuffer(batch_size)
+                if rows:
+                    buffers[key].extend(object_array([None] * rows))
+        for key, buffer in buffers.items():
+            buffer.extend(object_array([doc.get(key) for doc in batch]))
+        rows += len(batch)
+
+    return buffers, rows
+
+
+def stream_to_frame(
+    cursor: Iterable[Dict[str, Any]],
+    fields: Optional[Dict[str, Tuple[str, str]]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> pd.DataFrame:
+    if hasattr(cursor, "batch_size"):
+        cursor = cursor.batch_size(batch_size)
+
+    start = time.perf_counter()
+    batches = iter_batches(cursor, batch_size)
+
+    if fields is None:
+        buffers, rows = stream_documents(batches, batch_size)
+        df = pd.DataFrame({name: buffer.to_array() for name, buffer in buffers.items()}).infer_objects()
+    else:
+        buffers, rows = stream_fields(batches, fields, batch_size)
+        df = pd.DataFrame({name: buffer.to_array() for name, buffer in buffers.items()})
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed > 0 else 0,
+        "peak_rss_mb": peak_rss_mb()
+    }
+    df.attrs["ingest"] = stats
+
+    rss = f"{stats['peak_rss_mb']:,.1f} MB" if stats['peak_rss_mb'] is not None else "n/a"
+    print(f"Streamed {rows:,} documents in {elapsed:.2f}s "
+          f"({stats['rows_per_second']:,.0f} rows/s, peak RSS {rss})")
+
+    return df
@@ -0,0 +1,176 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import config
+import ingest
+
+
+PROFILERS = ["cprofile", "tracemalloc"]
+PROFILE_TOP_N = 20
+RSS_SAMPLE_SECONDS = 0.05
+
+
+def parse_profilers(value: str) -> List[str]:
+    profilers = [name.strip().lower() for name in value.split(",") if name.strip()]
+    unknown = [name for name in profilers if name not in PROFILERS]
+    if unknown:
+        raise ValueError(f"Unknown profilers: {', '.join(unknown)} (choose from {', '.join(PROFILERS)})")
+    return profilers
+
+
+def to_mb(size: float) -> float:
+    return round(size / 1024 ** 2, 2)
+
+
+class RssSampler:
+    def __init__(self, interval: float = RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self.peak: Optional[float] = None
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def sample(self) -> None:
+        rss = ingest.current_rss_mb()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def __enter__(self) -> "RssSampler":
+        self.sample()
+        if self.peak is not None:
+            self.thread = threading.Thread(target=self.run, name="rss-sampler", daemon=True)
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.sample()
+
+
+class RunRecorder:
+    def __init__(self, job: str, profilers: str = config.RUN_PROFILERS, record_dir: str = config.RUN_RECORD_DIR):
+        self.job = job
+        self.profilers = parse_profilers(profilers)
+        self.record_dir = record_dir
+        self.started_at = datetime.now()
+        self.stages: List[Dict[str, Any]] = []
+        self.profiler: Optional[cProfile.Profile] = None
+        self.start_time = time.perf_counter()
+
+    def start(self) -> "RunRecorder":
+        self.started_at = datetime.now()
+        self.start_time = time.perf_counter()
+        if "tracemalloc" in self.profilers and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if "cprofile" in self.profilers:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        return self
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None):
+        stage = {"name": name, "rows_in": rows_in, "rows_out": None}
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        sampler = RssSampler()
+        try:
+            with sampler:
+                yield stage
+            stage["status"] = "ok"
+        except Exception as e:
+            stage["status"] = "error"
+            stage["error"] = str(e)
+            raise
+        finally:
+            stage["seconds"] = round(time.perf_counter() - start, 4)
+            stage["peak_rss_mb"] = round(sampler.peak, 2) if sampler.peak is not None else None
+            if tracemalloc.is_tracing():
+                stage["traced_peak_mb"] = to_mb(tracemalloc.get_traced_memory()[1])
+            self.stages.append(stage)
+
+    def stop_profilers(self, record_path: Optional[str]) -> Dict[str, Any]:
+        profile = {}
+
+        if self.profiler is not None:
+            self.profiler.disable()
+            output = io.StringIO()
+            stats = pstats.Stats(self.profiler, stream=output).sort_stats("cumulative")
+            stats.print_stats(PROFILE_TOP_N)
+            profile["cprofile"] = {"top": output.getvalue()}
+            if record_path:
+                profile_path = record_path[:-len(".json")] + ".prof"
+                stats.dump_stats(profile_path)
+                profile["cprofile"]["path"] = profile_path
+            self.profiler = None
+
+        if "tracemalloc" in self.profilers and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            profile["tracemalloc"] = {
+                "peak_mb": to_mb(tracemalloc.get_traced_memory()[1]),
+                "top": [
+                    {"location": str(stat.traceback), "size_mb": to_mb(stat.size), "count": stat.count}
+                    for stat in snapshot.statistics("lineno")[:PROFILE_TOP_N]
+                ]
+            }
+            tracemalloc.stop()
+
+        return profile
+
+    def record_path(self) -> Optional[str]:
+        if not self.record_dir:
+            return None
+        return os.path.join(self.record_dir, f"{self.job}-{self.started_at.strftime('%Y%m%d-%H%M%S')}.json")
+
+    def finish(self, error: Optional[Exception] = None) -> Dict[str, Any]:
+        path = self.record_path()
+        if path:
+            os.makedirs(self.record_dir, exist_ok=True)
+
+        record = {
+            "job": self.job,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now().isoformat(),
+            "total_seconds": round(time.perf_counter() - self.start_time, 4),
+            "status": "error" if error else "ok",
+            "error": str(error) if error else None,
+            "stats_mode": config.STATS_MODE,
+            "peak_rss_mb": ingest.peak_rss_mb(),
+            "stages": self.stages,
+            "profile": self.stop_profilers(path)
+        }
+
+        self.print_summary(record)
+
+        if path:
+            with open(path, 'w') as f:
+                json.dump(record, f, indent=2, default=str)
+            print(f"Run record saved to {path}")
+
+        return record
+
+    def print_summary(self, record: Dict[str, Any]) -> None:
+        print("\nStage timings:")
+        for stage in record["stages"]:
+            rows = f"{stage['rows_out']:,} rows" if stage["rows_out"] is not None else ""
+            print(f"  {stage['name']:<10} {stage['seconds']:>9.3f}s {rows:>14}  ({stage['status']})")
+        print(f"  {'total':<10} {record['total_seconds']:>9.3f}s")
+
+        if "cprofile" in record["profile"]:
+            print("\ncProfile (top functions by cumulative time):")
+            print(record["profile"]["cprofile"]["top"])
+        if "tracemalloc" in record["profile"]:
+            print(f"tracemalloc peak: {record['profile']['tracemalloc']['peak_mb']:,.2f} MB")
@@ -0,0 +1,289 @@
+import argparse
+import json
+import math
+import os
+import time
+import pandas as pd
+from datetime import datetime, timedelta, timezone as tz
+from typing import Any, Dict, List, Optional, Tuple
+from bson import json_util
+from pymongo.errors import OperationFailure
+from main import MongoDBConnection, apply_batch_size
+import billing_fields
+import bills_queries
+import bucketing
+import config
+import creators
+import daily_comparison
+import rollup
+
+
+METRICS = list(billing_fields.BILLING_METRIC_PATHS)
+
+WATCHED_FIELDS = ["created_at", "created_by", "is_archived", "vendor_name"] + [
+    f"billing.{path}" for path in billing_fields.BILLING_METRIC_PATHS.values()
+]
+
+CHANGE_STREAM_HISTORY_LOST = 286
+
+Contribution = Tuple[str, str, str, float, float, float]
+
+
+def change_pipeline() -> List[Dict[str, Any]]:
+    projection = {"operationType": 1, "documentKey": 1}
+    projection.update({f"fullDocument.{field}": 1 for field in WATCHED_FIELDS})
+    return [
+        {"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}},
+        {"$project": projection}
+    ]
+
+
+def is_counted(bill: Dict[str, Any]) -> bool:
+    return bill.get("is_archived") is False and bill.get("created_by") not in config.EXCLUDED_USER_IDS
+
+
+class LiveMetrics:
+    def __init__(self, state_path: str = config.LIVE_METRICS_STATE_PATH, days: int = config.LIVE_METRICS_DAYS,
+                 timezone: str = config.REPORT_TIMEZONE):
+        self.state_path = state_path
+        self.days = max(1, days)
+        self.timezone = timezone
+        self.resume_token: Optional[Dict[str, Any]] = None
+        self.contributions: Dict[str, Contribution] = {}
+        self.counters: Dict[Tuple[str, str, str], List[float]] = {}
+        self.identities: Dict[str, str] = {}
+        self.looked_up_creators = set()
+        self.events = 0
+
+    def today(self) -> datetime:
+        return bucketing.local_now(self.timezone).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def window_start(self) -> datetime:
+        return self.today() - timedelta(days=self.days - 1)
+
+    def contribution(self, bill: Optional[Dict[str, Any]]) -> Optional[Contribution]:
+        if not bill or not is_counted(bill) or not isinstance(bill.get("created_at"), datetime):
+            return None
+
+        day = bucketing.local_day(bill["created_at"], self.timezone)
+        if day < self.window_start():
+            return None
+
+        values = billing_fields.metric_values(bill.get("billing"))
+        return (
+            rollup.day_key(day),
+            bill.get("vendor_name") or "Unknown",
+            str(bill.get("created_by") or "Unknown"),
+            *(0.0 if math.isnan(values[metric]) else values[metric] for metric in METRICS)
+        )
+
+    def add(self, contribution: Contribution, sign: int) -> None:
+        key = contribution[:3]
+        counter = self.counters.setdefault(key, [0, 0.0, 0.0, 0.0])
+        counter[0] += sign
+        for position, value in enumerate(contribution[3:], start=1):
+            counter[position] += sign * value
+        if counter[0] <= 0:
+            del self.counters[key]
+
+    def apply(self, bill_id: str, contribution: Optional[Contribution]) -> None:
+        previous = self.contributions.pop(bill_id, None)
+        if previous is not None:
+            self.add(previous, -1)
+        if contribution is not None:
+            self.contributions[bill_id] = contribution
+            self.add(contribution, 1)
+
+    def apply_change(self, change: Dict[str, Any]) -> None:
+        bill_id = str(change["documentKey"]["_id"])
+        bill = None if change["operationType"] == "delete" else change.get("fullDocument")
+        self.apply(bill_id, self.contribution(bill))
+        self.events += 1
+
+    def seed(self, collection) -> int:
+        start, _ = bucketing.utc_window(self.window_start(), self.window_start() + timedelta(days=1), self.timezone)
+        query = bills_queries.base_match()
+        query["created_at"] = {"$gte": start}
+        projection = {field: 1 for field in WATCHED_FIELDS}
+
+        self.contributions, self.counters = {}, {}
+        for bill in apply_batch_size(collection.find(query, projection)):
+            self.apply(str(bill["_id"]), self.contribution(bill))
+        return len(self.contributions)
+
+    def resolve_creators(self, connection: MongoDBConnection) -> None:
+        if not config.RESOLVE_CREATORS:
+            return
+        creator_ids = creators.object_id_strings(creator for _, _, creator in self.counters)
+        pending = [creator_id for creator_id in creator_ids if creator_id not in self.looked_up_creators]
+        if pending:
+            self.identities.update(creators.resolve_creators(connection, pd.Series(pending)))
+            self.looked_up_creators.update(pending)
+
+    def prune(self) -> None:
+        first_day = rollup.day_key(self.window_start())
+        stale = [bill_id for bill_id, contribution in self.contributions.items() if contribution[0] < first_day]
+        for bill_id in stale:
+            self.apply(bill_id, None)
+
+    def day_stats(self, day_start: datetime, breakdowns: bool = False) -> dict:
+        day = rollup.day_key(day_start)
+        rows = [(vendor, creator, *counter) for (key_day, vendor, creator), counter in self.counters.items() if key_day == day]
+        period = pd.DataFrame(rows, columns=['vendor_name', 'created_by', 'bills_count', *METRICS])
+
+        bills_count = int(period['bills_count'].sum())
+        if bills_count == 0:
+            return {
+                'bills_count': 0,
+                'total_bill_amount': 0,
+                'total_annual_kwh': 0,
+                'total_annual_cost': 0,
+                'avg_annual_cost_per_bill': 0
+            }
+
+        total_annual_cost = period['annual_cost'].sum()
+        stats = {
+            'bills_count': bills_count,
+            'total_bill_amount': period['bill_amount'].sum(),
+            'total_annual_kwh': period['annual_kwh'].sum(),
+            'total_annual_cost': total_annual_cost,
+            'avg_annual_cost_per_bill': total_annual_cost / bills_count
+        }
+
+        if breakdowns:
+            normalized = creators.normalize_creators(period['created_by'], self.identities)
+            stats['creator_stats'] = rollup.breakdown(period.assign(creator_normalized=normalized), 'creator_normalized')
+            stats['vendor_stats'] = rollup.breakdown(period, 'vendor_name')
+
+        return stats
+
+    def load(self) -> bool:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return False
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if state.get("timezone") != self.timezone or sorted(state.get("excluded_user_ids", [])) != sorted(config.EXCLUDED_USER_IDS):
+            return False
+
+        self.resume_token = json_util.loads(state["resume_token"]) if state.get("resume_token") else None
+        self.contributions, self.counters = {}, {}
+        for bill_id, contribution in state.get("contributions", {}).items():
+            self.apply(bill_id, tuple(contribution))
+        self.prune()
+        return self.resume_token is not None
+
+    def save(self) -> None:
+        if not self.state_path:
+            return
+
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                "resume_token": json_util.dumps(self.resume_token) if self.resume_token is not None else None,
+                "timezone": self.timezone,
+                "excluded_user_ids": list(config.EXCLUDED_USER_IDS),
+                "saved_at": datetime.now(tz.utc).isoformat(),
+                "contributions": self.contributions
+            }, f)
+        os.replace(tmp_path, self.state_path)
+
+
+def format_status(metrics: LiveMetrics) -> str:
+    today = metrics.today()
+    stats = metrics.day_stats(today)
+    return (f"[{datetime.now().strftime('%H:%M:%S')}] {rollup.day_key(today)}: {stats['bills_count']} bills, "
+            f"€{stats['total_bill_amount']:,.2f} billed, {stats['total_annual_kwh']:,.0f} kWh, "
+            f"€{stats['total_annual_cost']:,.2f} annual cost ({metrics.events} events)")
+
+
+def open_stream(collection, metrics: LiveMetrics):
+    options = {"full_document": "updateLookup", "max_await_time_ms": 1000}
+    if metrics.resume_token is not None:
+        try:
+            return collection.watch(change_pipeline(), resume_after=metrics.resume_token, **options)
+        except OperationFailure as e:
+            if e.code != CHANGE_STREAM_HISTORY_LOST:
+                raise
+            print("Resume token is no longer in the oplog, reseeding from the collection...")
+
+    stream = collection.watch(change_pipeline(), **options)
+    print(f"Seeding the last {metrics.days} days from {bills_queries.BILLS_COLLECTION}...")
+    print(f"Seeded {metrics.seed(collection)} bills")
+    metrics.resume_token = stream.resume_token
+    return stream
+
+
+def run(connection: MongoDBConnection, metrics: LiveMetrics, duration: Optional[float] = None,
+        checkpoint_seconds: float = config.LIVE_METRICS_CHECKPOINT_SECONDS,
+        status_seconds: float = config.LIVE_METRICS_STATUS_SECONDS) -> LiveMetrics:
+    collection = connection.get_collection(bills_queries.BILLS_DATABASE, bills_queries.BILLS_COLLECTION)
+
+    if metrics.load():
+        print(f"Resuming from {metrics.state_path} with {len(metrics.contributions)} tracked bills")
+
+    started = last_checkpoint = last_status = time.monotonic()
+    with open_stream(collection, metrics) as stream:
+        metrics.resolve_creators(connection)
+        try:
+            while stream.alive and (duration is None or time.monotonic() - started < duration):
+                change = stream.try_next()
+                if change is not None:
+                    metrics.apply_change(change)
+                metrics.resume_token = stream.resume_token
+
+                now = time.monotonic()
+                if now - last_status >= status_seconds:
+                    print(format_status(metrics))
+                    last_status = now
+                if now - last_checkpoint >= checkpoint_seconds:
+                    metrics.prune()
+                    metrics.resolve_creators(connection)
+                    metrics.save()
+                    last_checkpoint = now
+        finally:
+            metrics.save()
+
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep live intraday bill metrics from the utility_bills change stream")
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds (default: run until interrupted)")
+    parser.add_argument("--reset", action="store_true", help="ignore the saved resume token and reseed")
+    args = parser.parse_args()
+
+    connection = MongoDBConnection()
+    metrics = LiveMetrics()
+
+    try:
+        print("Connecting to MongoDB...")
+        connection.connect()
+
+        if args.reset and metrics.state_path and os.path.exists(metrics.state_path):
+            os.remove(metrics.state_path)
+
+        run(connection, metrics, duration=args.duration)
+
+    except KeyboardInterrupt:
+        print("\nStopped")
+    except Exception as e:
+        print(f"Error: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        connection.disconnect()
+
+    today = metrics.today()
+    if metrics.days > 1:
+        yesterday = today - timedelta(days=1)
+        print("\n" + daily_comparison.generate_daily_report(metrics.day_stats(today), metrics.day_stats(yesterday), today, yesterday))
+
+
+if __name__ == "__main__":
+    main()
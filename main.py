@@ -1,21 +1,120 @@
-from pymongo import MongoClient
-from typing import Optional
+import atexit
+import threading
+from pymongo import AsyncMongoClient, MongoClient
+from typing import Dict, Any, List, Optional
 import config
 
 
+COMPRESSOR_MODULES = {
+    "zstd": "zstandard",
+    "snappy": "snappy"
+}
+
+_shared_clients: Dict[tuple, MongoClient] = {}
+_shared_lock = threading.Lock()
+
+
+def available_compressors(names: str) -> List[str]:
+    compressors = []
+    for name in [name.strip() for name in names.split(",") if name.strip()]:
+        module = COMPRESSOR_MODULES.get(name)
+        if module:
+            try:
+                __import__(module)
+            except ImportError:
+                continue
+        compressors.append(name)
+    return compressors
+
+
+def client_options(**overrides) -> Dict[str, Any]:
+    options = {
+        "maxPoolSize": config.MONGODB_MAX_POOL_SIZE,
+        "minPoolSize": config.MONGODB_MIN_POOL_SIZE,
+        "compressors": config.MONGODB_COMPRESSORS,
+        "readPreference": config.MONGODB_READ_PREFERENCE,
+        "serverSelectionTimeoutMS": config.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": config.MONGODB_SOCKET_TIMEOUT_MS
+    }
+    options.update(overrides)
+    
+    if options.get("compressors"):
+        options["compressors"] = ",".join(available_compressors(options["compressors"])) or None
+    
+    return {key: value for key, value in options.items() if value is not None}
+
+
+def get_shared_client(uri: str = config.MONGODB_URI, **overrides) -> MongoClient:
+    options = client_options(**overrides)
+    key = (uri, tuple(sorted(options.items())))
+    
+    with _shared_lock:
+        if key not in _shared_clients:
+            _shared_clients[key] = MongoClient(uri, **options)
+        return _shared_clients[key]
+
+
+def close_shared_clients() -> None:
+    with _shared_lock:
+        for client in _shared_clients.values():
+            client.close()
+        _shared_clients.clear()
+
+
+atexit.register(close_shared_clients)
+
+
+def apply_batch_size(cursor, batch_size: Optional[int] = config.MONGODB_BATCH_SIZE):
+    if batch_size:
+        cursor = cursor.batch_size(batch_size)
+    return cursor
+
+
 class MongoDBConnection:
-    def __init__(self, uri: str = config.MONGODB_URI):
+    def __init__(self, uri: str = config.MONGODB_URI, shared: bool = config.MONGODB_SHARED_CLIENT, **options):
         self.uri = uri
+        self.shared = shared
+        self.options = options
         self.client: Optional[MongoClient] = None
         
     def connect(self) -> MongoClient:
         if self.client is None:
-            self.client = MongoClient(self.uri)
+            if self.shared:
+                self.client = get_shared_client(self.uri, **self.options)
+            else:
+                self.client = MongoClient(self.uri, **client_options(**self.options))
         return self.client
     
     def disconnect(self) -> None:
         if self.client:
-            self.client.close()
+            if not self.shared:
+                self.client.close()
+            self.client = None
+    
+    def get_database(self, database_name: str):
+        if self.client is None:
+            self.connect()
+        return self.client[database_name]
+    
+    def get_collection(self, database_name: str, collection_name: str):
+        db = self.get_database(database_name)
+        return db[collection_name]
+
+
+class AsyncMongoDBConnection:
+    def __init__(self, uri: str = config.MONGODB_URI, **options):
+        self.uri = uri
+        self.options = options
+        self.client: Optional[AsyncMongoClient] = None
+    
+    def connect(self) -> AsyncMongoClient:
+        if self.client is None:
+            self.client = AsyncMongoClient(self.uri, **client_options(**self.options))
+        return self.client
+    
+    async def disconnect(self) -> None:
+        if self.client:
+            await self.client.close()
             self.client = None
     
     def get_database(self, database_name: str):
@@ -51,4 +150,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,139 @@
+import os
+import time
+import pandas as pd
+from bson import ObjectId
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from main import MongoDBConnection, apply_batch_size
+import config
+import ingest
+
+
+EXECUTORS = ["thread", "process"]
+SAMPLES_PER_PARTITION = 32
+
+BSON_TYPE_ALIASES = [
+    (ObjectId, "objectId"),
+    (datetime, "date"),
+    (str, "string"),
+    ((int, float), "number")
+]
+
+
+def bson_type_alias(value: Any) -> Optional[str]:
+    for types, alias in BSON_TYPE_ALIASES:
+        if isinstance(value, types) and not isinstance(value, bool):
+            return alias
+    return None
+
+
+def check_partition_field(collection, field: str) -> str:
+    if not any(next(iter(index["key"])) == field for index in collection.list_indexes()):
+        raise ValueError(f"Partition field {field} has no index on {collection.name} "
+                         f"(each range would scan the whole collection)")
+    return field
+
+
+def sample_boundaries(collection, field: str, partitions: int,
+                      query: Optional[Dict[str, Any]] = None) -> Tuple[List[Any], Optional[str]]:
+    pipeline = ([{"$match": query}] if query else []) + [
+        {"$sample": {"size": partitions * SAMPLES_PER_PARTITION}},
+        {"$project": {field: 1}}
+    ]
+    values = [doc.get(field) for doc in collection.aggregate(pipeline)]
+
+    aliases = Counter(bson_type_alias(value) for value in values)
+    aliases.pop(None, None)
+    if not aliases:
+        return [], None
+
+    alias = aliases.most_common(1)[0][0]
+    values = sorted({value for value in values if bson_type_alias(value) == alias})
+    boundaries = [values[len(values) * index // partitions] for index in range(1, partitions)]
+    return sorted(set(boundaries)), alias
+
+
+def range_queries(query: Dict[str, Any], field: str, boundaries: List[Any], alias: Optional[str]) -> List[Dict[str, Any]]:
+    if not boundaries:
+        return [query]
+
+    bounds = [None, *boundaries, None]
+    ranges = []
+    for lower, upper in zip(bounds[:-1], bounds[1:]):
+        condition = {}
+        if lower is not None:
+            condition["$gte"] = lower
+        if upper is not None:
+            condition["$lt"] = upper
+        ranges.append({field: condition})
+
+    ranges.append({field: {"$not": {"$type": alias}}})
+    return [{"$and": [query, condition]} if query else condition for condition in ranges]
+
+
+def fetch_range(collection, query: Dict[str, Any], projection: Optional[Dict[str, Any]],
+                fields: Optional[Dict[str, Tuple[str, str]]]) -> pd.DataFrame:
+    cursor = apply_batch_size(collection.find(query, dict(projection) if projection else None))
+    if config.STREAM_BATCH_SIZE:
+        return ingest.stream_to_frame(cursor, fields, config.STREAM_BATCH_SIZE)
+    return pd.DataFrame(list(cursor))
+
+
+def fetch_range_in_process(uri: str, options: Dict[str, Any], database: str, collection: str, query: Dict[str, Any],
+                           projection: Optional[Dict[str, Any]],
+                           fields: Optional[Dict[str, Tuple[str, str]]]) -> pd.DataFrame:
+    connection = MongoDBConnection(uri=uri, shared=False, **options)
+    try:
+        return fetch_range(connection.get_collection(database, collection), query, projection, fields)
+    finally:
+        connection.disconnect()
+
+
+def fetch_partitioned(
+    connection: MongoDBConnection,
+    database: str,
+    collection_name: str,
+    query: Optional[Dict[str, Any]] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    fields: Optional[Dict[str, Tuple[str, str]]] = None,
+    partitions: int = config.FETCH_PARTITIONS,
+    field: str = config.FETCH_PARTITION_FIELD,
+    workers: int = config.FETCH_WORKERS,
+    executor: str = config.FETCH_EXECUTOR
+) -> pd.DataFrame:
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown fetch executor: {executor} (choose from {', '.join(EXECUTORS)})")
+
+    collection = connection.get_collection(database, collection_name)
+    query = query or {}
+    start = time.perf_counter()
+
+    boundaries, alias = sample_boundaries(collection, check_partition_field(collection, field), partitions, query)
+    queries = range_queries(query, field, boundaries, alias)
+    if not workers:
+        workers = len(queries) if executor == "thread" else os.cpu_count() or 1
+    workers = min(len(queries), workers)
+
+    if executor == "process":
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(fetch_range_in_process, *zip(*[
+                (connection.uri, connection.options, database, collection_name, range_query, projection, fields)
+                for range_query in queries
+            ])))
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch") as pool:
+            frames = list(pool.map(lambda range_query: fetch_range(collection, range_query, projection, fields), queries))
+
+    frames = [frame for frame in frames if not frame.empty]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    elapsed = time.perf_counter() - start
+    print(f"Fetched {len(df):,} documents in {len(queries)} {field} ranges with {workers} {executor} workers "
+          f"in {elapsed:.2f}s ({len(df) / elapsed if elapsed > 0 else 0:,.0f} rows/s)")
+    return df
+
+
+def enabled(limit: Optional[int] = None) -> bool:
+    return config.FETCH_PARTITIONS > 1 and not limit
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import List, NamedTuple
+
+
+TIME_INDEX_ATTR = 'time_index'
+METRIC_COLUMNS = ['bill_amount', 'annual_kwh', 'annual_cost']
+
+
+class Period(NamedTuple):
+    label: str
+    start: datetime
+    end: datetime
+
+
+def is_time_indexed(df: pd.DataFrame, column: str = 'day_start') -> bool:
+    return (df.attrs.get(TIME_INDEX_ATTR) == column and isinstance(df.index, pd.DatetimeIndex)
+            and df.index.is_monotonic_increasing)
+
+
+def sort_by_time(df: pd.DataFrame, column: str = 'day_start') -> pd.DataFrame:
+    if df.empty or is_time_indexed(df, column):
+        return df
+    df = df.set_index(pd.DatetimeIndex(df[column].to_numpy()), drop=False).sort_index(kind='stable')
+    df.attrs[TIME_INDEX_ATTR] = column
+    return df
+
+
+def period_bounds(df: pd.DataFrame, starts: List[datetime], ends: List[datetime]) -> tuple:
+    return (df.index.searchsorted(pd.DatetimeIndex(starts), side='left'),
+            df.index.searchsorted(pd.DatetimeIndex(ends), side='left'))
+
+
+def slice_period(df: pd.DataFrame, start: datetime, end: datetime, column: str = 'day_start') -> pd.DataFrame:
+    if not is_time_indexed(df, column):
+        return df[(df[column] >= start) & (df[column] < end)]
+    starts, ends = period_bounds(df, [start], [end])
+    return df.iloc[starts[0]:ends[0]]
+
+
+def period_stats(df: pd.DataFrame, periods: List[Period], column: str = 'day_start') -> pd.DataFrame:
+    df = sort_by_time(df, column)
+    labels = [period.label for period in periods]
+
+    if df.empty:
+        starts = ends = np.zeros(len(periods), dtype=np.int64)
+    else:
+        starts, ends = period_bounds(df, [period.start for period in periods], [period.end for period in periods])
+
+    stats = pd.DataFrame({
+        'start': [period.start for period in periods],
+        'end': [period.end for period in periods],
+        'bills_count': ends - starts
+    }, index=pd.Index(labels, name='period'))
+
+    for metric in METRIC_COLUMNS:
+        values = df[metric].to_numpy(dtype=np.float64) if metric in df.columns else np.zeros(len(df))
+        cumulative = np.concatenate([[0.0], np.nancumsum(values)])
+        stats[f'total_{metric}'] = cumulative[ends] - cumulative[starts]
+
+    stats['avg_annual_cost_per_bill'] = np.where(
+        stats['bills_count'] > 0, stats['total_annual_cost'] / stats['bills_count'].clip(lower=1), 0.0
+    )
+    return stats
+
+
+def trailing_weeks(current_week_start: datetime, count: int) -> List[Period]:
+    starts = [current_week_start - timedelta(weeks=offset) for offset in range(count - 1, -1, -1)]
+    return [Period(f"Week {start.isocalendar()[1]}", start, start + timedelta(days=7)) for start in starts]
+
+
+def trailing_days(day_start: datetime, count: int) -> List[Period]:
+    starts = [day_start - timedelta(days=offset) for offset in range(count - 1, -1, -1)]
+    return [Period(start.strftime('%Y-%m-%d'), start, start + timedelta(days=1)) for start in starts]
+
+
+def month_to_date(today: datetime) -> List[Period]:
+    day_start = today.replace(hour=0, minute=0, second=0, microsecond=0)
+    month_start = day_start.replace(day=1)
+    previous_month_start = (month_start - timedelta(days=1)).replace(day=1)
+    return [
+        Period(previous_month_start.strftime('%B %Y'), previous_month_start, month_start),
+        Period(f"{month_start.strftime('%B %Y')} to date", month_start, day_start + timedelta(days=1))
+    ]
@@ -0,0 +1,222 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+import pandas as pd
+from bson import ObjectId, json_util
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from main import MongoDBConnection
+import config
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+INDEX_FILE = "_index.json"
+
+
+def is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def cache_key(database: str, collection: str, query: Optional[Dict[str, Any]],
+              projection: Optional[Dict[str, Any]], limit: Optional[int]) -> str:
+    spec = json_util.dumps([database, collection, query or {}, projection, limit or 0], sort_keys=True)
+    return hashlib.sha256(spec.encode("utf-8")).hexdigest()
+
+
+def last_change(connection: MongoDBConnection, database: str, collection: str,
+                field: str = config.QUERY_CACHE_CHANGE_FIELD) -> Optional[str]:
+    if not field:
+        return None
+    doc = connection.get_collection(database, collection).find_one({field: {"$exists": True}}, {field: 1},
+                                                                   sort=[(field, -1)])
+    return json_util.dumps(doc[field]) if doc else None
+
+
+def collection_fingerprint(connection: MongoDBConnection, database: str, collection: str) -> Dict[str, Any]:
+    try:
+        stats = connection.get_database(database).command("collStats", collection)
+        fingerprint = {"count": stats.get("count"), "size": stats.get("size")}
+    except Exception:
+        fingerprint = {"count": connection.get_collection(database, collection).estimated_document_count()}
+    fingerprint["last_change"] = last_change(connection, database, collection)
+    return fingerprint
+
+
+def encode_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    encoded = df.copy()
+    codecs = {}
+    for column in df.columns:
+        if df[column].dtype != object:
+            continue
+        present = [value for value in df[column] if not is_missing(value)]
+        if not present or all(isinstance(value, str) for value in present):
+            continue
+        if all(isinstance(value, ObjectId) for value in present):
+            codecs[column] = "objectid"
+            encoded[column] = [None if is_missing(value) else str(value) for value in df[column]]
+        else:
+            codecs[column] = "json"
+            encoded[column] = [None if is_missing(value) else json_util.dumps(value) for value in df[column]]
+    return encoded, codecs
+
+
+def decode_frame(df: pd.DataFrame, codecs: Dict[str, str]) -> pd.DataFrame:
+    for column, codec in codecs.items():
+        decode = ObjectId if codec == "objectid" else json_util.loads
+        df[column] = pd.Series([None if is_missing(value) else decode(value) for value in df[column].astype(object)],
+                               index=df.index, dtype=object)
+    return df
+
+
+class QueryCache:
+    def __init__(self, directory: str = config.QUERY_CACHE_DIR,
+                 ttl_seconds: float = config.QUERY_CACHE_TTL_MINUTES * 60,
+                 max_age_seconds: float = config.QUERY_CACHE_MAX_AGE_HOURS * 3600,
+                 max_bytes: int = int(config.QUERY_CACHE_MAX_MB * 1024 * 1024)):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.entries = self.load()
+
+    def load(self) -> Dict[str, dict]:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def remove(self, key: str) -> None:
+        self.entries.pop(key, None)
+        if os.path.exists(self.path(key)):
+            os.remove(self.path(key))
+
+    def get(self, key: str, fingerprint: Callable[[], Dict[str, Any]]) -> Optional[pd.DataFrame]:
+        entry = self.entries.get(key)
+        if entry is None or not os.path.exists(self.path(key)):
+            return None
+
+        now = time.time()
+        if now - entry["created_at"] >= self.max_age_seconds:
+            self.remove(key)
+            self.save()
+            return None
+
+        if now - entry["validated_at"] >= self.ttl_seconds:
+            if fingerprint() != entry["fingerprint"]:
+                self.remove(key)
+                self.save()
+                return None
+            entry["validated_at"] = now
+
+        entry["used_at"] = now
+        self.save()
+        return decode_frame(pd.read_parquet(self.path(key)), entry["codecs"])
+
+    def put(self, key: str, df: pd.DataFrame, fingerprint: Dict[str, Any], database: str, collection: str) -> bool:
+        encoded, codecs = encode_frame(df)
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.path(key) + ".tmp"
+        try:
+            encoded.to_parquet(tmp_path, index=False, compression="zstd")
+        except (TypeError, ValueError, pyarrow.lib.ArrowException) as e:
+            print(f"Query result not cached: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, self.path(key))
+
+        now = time.time()
+        self.entries[key] = {
+            "database": database,
+            "collection": collection,
+            "rows": len(df),
+            "bytes": os.path.getsize(self.path(key)),
+            "codecs": codecs,
+            "fingerprint": fingerprint,
+            "created_at": now,
+            "validated_at": now,
+            "used_at": now
+        }
+        self.evict()
+        self.save()
+        return True
+
+    def evict(self) -> List[str]:
+        evicted = []
+        total = sum(entry["bytes"] for entry in self.entries.values())
+        for key, entry in sorted(self.entries.items(), key=lambda item: item[1]["used_at"]):
+            if total <= self.max_bytes:
+                break
+            total -= entry["bytes"]
+            self.remove(key)
+            evicted.append(key)
+        return evicted
+
+    def invalidate(self, database: Optional[str] = None, collection: Optional[str] = None) -> int:
+        keys = [key for key, entry in self.entries.items()
+                if database in (None, entry["database"]) and collection in (None, entry["collection"])]
+        for key in keys:
+            self.remove(key)
+        self.save()
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.entries),
+            "rows": sum(entry["rows"] for entry in self.entries.values()),
+            "megabytes": sum(entry["bytes"] for entry in self.entries.values()) / (1024 * 1024)
+        }
+
+
+def get_cache() -> Optional[QueryCache]:
+    if not config.QUERY_CACHE_DIR:
+        return None
+    if pyarrow is None:
+        print("Query cache disabled: it requires pyarrow (pip install pyarrow)")
+        return None
+    return QueryCache()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the local query result cache")
+    parser.add_argument("--invalidate", metavar="DATABASE[.COLLECTION]", help="drop cached results for a database or collection")
+    parser.add_argument("--clear", action="store_true", help="drop every cached result")
+    args = parser.parse_args()
+
+    cache = get_cache()
+    if cache is None:
+        print("Set QUERY_CACHE_DIR to enable the query cache")
+        return
+
+    if args.clear:
+        print(f"Dropped {cache.invalidate()} cached results")
+    elif args.invalidate:
+        database, _, collection = args.invalidate.partition(".")
+        print(f"Dropped {cache.invalidate(database, collection or None)} cached results")
+
+    stats = cache.stats()
+    print(f"{stats['entries']} cached results, {stats['rows']:,} rows, {stats['megabytes']:.1f} MB in {cache.directory}")
+
+
+if __name__ == "__main__":
+    main()
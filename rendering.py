@@ -0,0 +1,143 @@
+import html
+import io
+import json
+import re
+from datetime import date
+from typing import Any, Callable, Iterable, List, Optional, TextIO, Tuple, Union
+
+
+FORMATS = {"markdown": ".md", "html": ".html", "json": ".json"}
+LAYOUT_FORMATS = ("markdown", "html")
+
+BOLD = re.compile(r"\*\*([^<\n]+?)\*\*")
+CODE = re.compile(r"`([^`<\n]+)`")
+
+ListItem = Union[str, Tuple[str, List[str]]]
+
+
+def plain_text(text: str) -> str:
+    return text.replace("**", "").replace("`", "")
+
+
+def html_markup(escaped: str) -> str:
+    if "*" not in escaped and "`" not in escaped:
+        return escaped
+    return CODE.sub(r"<code>\1</code>", BOLD.sub(r"<strong>\1</strong>", escaped))
+
+
+def html_text(text: str) -> str:
+    return html_markup(html.escape(text, quote=False))
+
+
+def check_format(fmt: str) -> str:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown report format: {fmt} (choose from {', '.join(FORMATS)})")
+    return fmt
+
+
+def json_value(value: Any) -> Any:
+    if hasattr(value, "to_dict"):
+        return value.to_dict(orient="index") if hasattr(value, "columns") else value.to_dict()
+    if isinstance(value, date):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def render_data(data: dict, out: Optional[TextIO] = None) -> str:
+    text = json.dumps(data, indent=2, ensure_ascii=False, default=json_value) + "\n"
+    if out is None:
+        return text
+    out.write(text)
+    return ""
+
+
+class ReportWriter:
+    def __init__(self, out: TextIO, fmt: str = "markdown", title: str = "Report"):
+        if check_format(fmt) not in LAYOUT_FORMATS:
+            raise ValueError(f"ReportWriter only writes {' and '.join(LAYOUT_FORMATS)}; use render_data for {fmt}")
+        self.out = out
+        self.fmt = fmt
+        self.title = title
+
+    def __enter__(self) -> "ReportWriter":
+        if self.fmt == "html":
+            self.out.write(f'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+                           f'<title>{html.escape(plain_text(self.title))}</title>\n</head>\n<body>\n')
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.fmt == "html":
+            self.out.write("</body>\n</html>\n")
+
+    def heading(self, text: str, level: int = 2) -> None:
+        if self.fmt == "markdown":
+            self.out.write(f"{'#' * level} {text}\n\n")
+        elif self.fmt == "html":
+            self.out.write(f"<h{level}>{html_text(text)}</h{level}>\n")
+
+    def paragraph(self, text: str) -> None:
+        if self.fmt == "markdown":
+            self.out.write(f"{text}\n\n")
+        elif self.fmt == "html":
+            self.out.write(f"<p>{html_text(text)}</p>\n")
+
+    def rule(self) -> None:
+        if self.fmt == "markdown":
+            self.out.write("---\n\n")
+        elif self.fmt == "html":
+            self.out.write("<hr>\n")
+
+    def bullets(self, items: Iterable[str], title: Optional[str] = None) -> None:
+        if self.fmt == "markdown":
+            if title is not None:
+                self.out.write(f"{title}\n")
+            for item in items:
+                self.out.write(f"- {item}\n")
+            self.out.write("\n")
+        elif self.fmt == "html":
+            if title is not None:
+                self.out.write(f"<p>{html_text(title)}</p>\n")
+            self.out.write("<ul>\n")
+            for item in items:
+                self.out.write(f"<li>{html_text(item)}</li>\n")
+            self.out.write("</ul>\n")
+
+    def numbered(self, items: Iterable[ListItem], start: int = 1) -> None:
+        items = [(item, []) if isinstance(item, str) else item for item in items]
+        if self.fmt == "markdown":
+            for number, (text, subitems) in enumerate(items, start=start):
+                self.out.write(f"{number}. {text}\n")
+                for subitem in subitems:
+                    self.out.write(f"   - {subitem}\n")
+            self.out.write("\n")
+        elif self.fmt == "html":
+            self.out.write(f'<ol start="{start}">\n')
+            for text, subitems in items:
+                self.out.write(f"<li>{html_text(text)}")
+                if subitems:
+                    self.out.write("<ul>" + "".join(f"<li>{html_text(subitem)}</li>" for subitem in subitems) + "</ul>")
+                self.out.write("</li>\n")
+            self.out.write("</ol>\n")
+
+    def table(self, columns: List[str], rows: Iterable[Iterable]) -> None:
+        if self.fmt == "markdown":
+            self.out.write("| " + " | ".join(columns) + " |\n")
+            self.out.write("|" + "|".join("-" * (len(column) + 2) for column in columns) + "|\n")
+            row_format = "| " + " | ".join(["{}"] * len(columns)) + " |\n"
+            self.out.write("".join([row_format.format(*row) for row in rows]) + "\n")
+        elif self.fmt == "html":
+            self.out.write("<table>\n<tr>" + "".join(f"<th>{html_text(column)}</th>" for column in columns) + "</tr>\n")
+            self.out.write(html_markup("".join([
+                "<tr><td>" + "</td><td>".join([html.escape(str(cell), quote=False) for cell in row]) + "</td></tr>\n" for row in rows
+            ])))
+            self.out.write("</table>\n")
+
+
+def render(write: Callable[[ReportWriter], None], fmt: str = "markdown", title: str = "Report",
+           out: Optional[TextIO] = None) -> str:
+    buffer = io.StringIO() if out is None else out
+    with ReportWriter(buffer, fmt, title) as writer:
+        write(writer)
+    return buffer.getvalue() if out is None else ""
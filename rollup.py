@@ -0,0 +1,223 @@
+import argparse
+import uuid
+import pandas as pd
+from datetime import datetime, timedelta, timezone as tz
+from typing import Dict, Any, List, Optional
+from main import MongoDBConnection
+import bills_queries
+import bucketing
+import config
+import creators
+
+
+ROLLUP_COLLECTION = "utility_bills_daily_rollup"
+ROLLUP_STATE_COLLECTION = "utility_bills_rollup_state"
+ROLLUP_STATE_ID = "daily"
+
+ROLLUP_COLUMNS = ['day', 'vendor_name', 'created_by', 'creator_normalized',
+                  'bills_count', 'bill_amount', 'annual_kwh', 'annual_cost']
+
+
+def day_expr(timezone: str) -> Dict[str, Any]:
+    return {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at", "timezone": timezone}}
+
+
+def day_key(day_start: datetime) -> str:
+    return day_start.strftime('%Y-%m-%d')
+
+
+def touched_days_pipeline(since: Optional[datetime], timezone: str) -> List[Dict[str, Any]]:
+    pipeline = []
+    if since is not None:
+        pipeline.append({"$match": {"$or": [
+            {"created_at": {"$gte": since}},
+            {"updated_at": {"$gte": since}}
+        ]}})
+    pipeline.append({"$group": {
+        "_id": day_expr(timezone),
+        "max_created_at": {"$max": "$created_at"},
+        "max_updated_at": {"$max": "$updated_at"}
+    }})
+    return pipeline
+
+
+def rollup_pipeline(match: Dict[str, Any], timezone: str, refresh_id: str) -> List[Dict[str, Any]]:
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "day": day_expr(timezone),
+                "vendor_name": bills_queries.vendor_key(),
+                "created_by": bills_queries.creator_key()
+            },
+            "creator_normalized": {"$first": bills_queries.CREATOR_NORMALIZED_EXPR},
+            "bills_count": {"$sum": 1},
+            **bills_queries.metric_sums()
+        }},
+        {"$set": {
+            "day": "$_id.day",
+            "vendor_name": "$_id.vendor_name",
+            "created_by": "$_id.created_by",
+            "refresh_id": refresh_id
+        }},
+        {"$merge": {
+            "into": ROLLUP_COLLECTION,
+            "on": "_id",
+            "whenMatched": "replace",
+            "whenNotMatched": "insert"
+        }}
+    ]
+
+
+def days_match(days: List[str], timezone: str) -> Dict[str, Any]:
+    windows = []
+    for day in days:
+        day_start = datetime.strptime(day, '%Y-%m-%d')
+        start, end = bucketing.utc_window(day_start, day_start + timedelta(days=1), timezone)
+        windows.append({"created_at": {"$gte": start, "$lt": end}})
+
+    match = bills_queries.base_match()
+    match["$or"] = windows
+    return match
+
+
+def load_state(connection: MongoDBConnection) -> Dict[str, Any]:
+    state_collection = connection.get_collection(bills_queries.BILLS_DATABASE, ROLLUP_STATE_COLLECTION)
+    return state_collection.find_one({"_id": ROLLUP_STATE_ID}) or {}
+
+
+def needs_full_refresh(state: Dict[str, Any], timezone: str) -> bool:
+    return (
+        state.get("watermark") is None
+        or state.get("timezone") != timezone
+        or sorted(state.get("excluded_user_ids", [])) != sorted(config.EXCLUDED_USER_IDS)
+    )
+
+
+def refresh_rollup(connection: MongoDBConnection, full: bool = False,
+                   timezone: str = config.REPORT_TIMEZONE,
+                   lag_minutes: float = config.ROLLUP_WATERMARK_LAG_MINUTES) -> List[str]:
+    bills = connection.get_collection(bills_queries.BILLS_DATABASE, bills_queries.BILLS_COLLECTION)
+    rollup = connection.get_collection(bills_queries.BILLS_DATABASE, ROLLUP_COLLECTION)
+    state_collection = connection.get_collection(bills_queries.BILLS_DATABASE, ROLLUP_STATE_COLLECTION)
+
+    state = load_state(connection)
+    full = full or needs_full_refresh(state, timezone)
+    watermark = None if full else state["watermark"]
+    since = None if watermark is None else watermark - timedelta(minutes=lag_minutes)
+
+    touched = list(bills.aggregate(touched_days_pipeline(since, timezone)))
+    days = sorted(row["_id"] for row in touched if row["_id"] is not None)
+
+    timestamps = [row[field] for row in touched for field in ("max_created_at", "max_updated_at")
+                  if isinstance(row.get(field), datetime)]
+    if watermark is not None:
+        timestamps.append(watermark)
+    new_watermark = max(timestamps) if timestamps else None
+
+    rollup.create_index("day")
+    refresh_id = uuid.uuid4().hex
+    if full:
+        list(bills.aggregate(rollup_pipeline(bills_queries.base_match(), timezone, refresh_id)))
+        rollup.delete_many({"refresh_id": {"$ne": refresh_id}})
+    elif days:
+        list(bills.aggregate(rollup_pipeline(days_match(days, timezone), timezone, refresh_id)))
+        rollup.delete_many({"day": {"$in": days}, "refresh_id": {"$ne": refresh_id}})
+
+    state_collection.replace_one({"_id": ROLLUP_STATE_ID}, {
+        "_id": ROLLUP_STATE_ID,
+        "watermark": new_watermark,
+        "timezone": timezone,
+        "excluded_user_ids": list(config.EXCLUDED_USER_IDS),
+        "refreshed_at": datetime.now(tz.utc),
+        "last_refresh_days": len(days),
+        "last_refresh_full": full
+    }, upsert=True)
+
+    print(f"Rollup refreshed: {'full rebuild' if full else 'incremental'}, {len(days)} days recomputed")
+    return days
+
+
+def read_rollup(connection: MongoDBConnection, start: Optional[datetime] = None,
+                end: Optional[datetime] = None) -> pd.DataFrame:
+    rollup = connection.get_collection(bills_queries.BILLS_DATABASE, ROLLUP_COLLECTION)
+
+    day_range = {}
+    if start is not None:
+        day_range["$gte"] = day_key(start)
+    if end is not None:
+        day_range["$lt"] = day_key(end)
+    query = {"day": day_range} if day_range else {}
+
+    projection = {column: 1 for column in ROLLUP_COLUMNS}
+    projection["_id"] = 0
+
+    df = pd.DataFrame(list(rollup.find(query, projection)), columns=ROLLUP_COLUMNS)
+    df['day_start'] = pd.to_datetime(df['day'], format='%Y-%m-%d')
+    return df
+
+
+def breakdown(period: pd.DataFrame, key: str) -> pd.DataFrame:
+    grouped = period.groupby(key).agg({
+        'bills_count': 'sum',
+        'bill_amount': 'sum',
+        'annual_kwh': 'sum',
+        'annual_cost': 'sum'
+    }).rename(columns={'bills_count': 'created_by'})
+    return grouped.sort_values('created_by', ascending=False)
+
+
+def period_stats(df: pd.DataFrame, start: datetime, end: datetime, breakdowns: bool = False,
+                 identities: Optional[Dict[str, str]] = None) -> dict:
+    period = df[(df['day_start'] >= start) & (df['day_start'] < end)]
+    bills_count = int(period['bills_count'].sum())
+
+    if bills_count == 0:
+        return {
+            'bills_count': 0,
+            'total_bill_amount': 0,
+            'total_annual_kwh': 0,
+            'total_annual_cost': 0,
+            'avg_annual_cost_per_bill': 0
+        }
+
+    total_annual_cost = period['annual_cost'].sum()
+    stats = {
+        'bills_count': bills_count,
+        'total_bill_amount': period['bill_amount'].sum(),
+        'total_annual_kwh': period['annual_kwh'].sum(),
+        'total_annual_cost': total_annual_cost,
+        'avg_annual_cost_per_bill': total_annual_cost / bills_count
+    }
+
+    if breakdowns:
+        normalized = creators.normalize_creators(period['created_by'], identities)
+        stats['creator_stats'] = breakdown(period.assign(creator_normalized=normalized), 'creator_normalized')
+        stats['vendor_stats'] = breakdown(period, 'vendor_name')
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the daily utility bills rollup")
+    parser.add_argument("--full", action="store_true", help="rebuild every day instead of only touched days (needed after bills move to another day or are deleted)")
+    args = parser.parse_args()
+
+    connection = MongoDBConnection()
+
+    try:
+        print("Connecting to MongoDB...")
+        connection.connect()
+
+        refresh_rollup(connection, full=args.full)
+
+    except Exception as e:
+        print(f"Error: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        connection.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import argparse
+import pandas as pd
+from concurrent.futures import Future
+from typing import List, Optional
+from main import MongoDBConnection
+import bills_analysis
+import bucketing
+import config
+import creators
+import daily_comparison
+import glue
+import instrumentation
+import periods
+import weekly_comparison
+
+
+REPORTS = ["analysis", "daily", "weekly", "trend"]
+DEFAULT_REPORTS = ["analysis", "daily", "weekly"]
+
+
+def print_report(title: str, report: str) -> None:
+    print("\n" + "="*80)
+    print(title)
+    print("="*80)
+    print(report)
+    print("="*80)
+
+
+def run_analysis(processed_df: pd.DataFrame) -> None:
+    print("Aggregating by week...")
+    aggregated_df = bills_analysis.aggregate_by_week(processed_df)
+
+    bills_analysis.print_summary(aggregated_df, processed_df)
+    bills_analysis.export_analysis(aggregated_df)
+
+
+def build_daily_report(processed_df: pd.DataFrame) -> str:
+    target_start, comparison_start = daily_comparison.get_report_days(bucketing.local_now())
+
+    print(f"Analyzing {target_start.strftime('%Y-%m-%d')} vs {comparison_start.strftime('%Y-%m-%d')}...")
+
+    target_stats = daily_comparison.get_day_stats(processed_df, target_start)
+    comparison_stats = daily_comparison.get_day_stats(processed_df, comparison_start)
+
+    report = daily_comparison.generate_daily_report(target_stats, comparison_stats, target_start, comparison_start)
+    print_report("DAILY COMPARISON REPORT", report)
+    return report
+
+
+def build_weekly_report(processed_df: pd.DataFrame) -> str:
+    current_week_start, last_week_start = weekly_comparison.get_report_weeks(bucketing.local_now())
+    current_week_num = current_week_start.isocalendar()[1]
+    last_week_num = last_week_start.isocalendar()[1]
+
+    print(f"Analyzing Week {current_week_num} vs Week {last_week_num}...")
+
+    current_week_stats = weekly_comparison.get_week_stats(processed_df, current_week_start)
+    last_week_stats = weekly_comparison.get_week_stats(processed_df, last_week_start)
+
+    report = weekly_comparison.generate_comparison_report(current_week_stats, last_week_stats, current_week_num, last_week_num)
+    print_report("WEEKLY COMPARISON REPORT", report)
+    return report
+
+
+def build_trend_report(processed_df: pd.DataFrame, weeks: int) -> str:
+    now = bucketing.local_now()
+    current_week_start, _ = weekly_comparison.get_report_weeks(now)
+
+    print(f"Analyzing the last {weeks} weeks...")
+
+    weekly_stats = periods.period_stats(processed_df, periods.trailing_weeks(current_week_start, weeks))
+    monthly_stats = periods.period_stats(processed_df, periods.month_to_date(now))
+
+    report = weekly_comparison.generate_trend_report(weekly_stats, monthly_stats)
+    print_report("WEEKLY TREND REPORT", report)
+    return report
+
+
+def glue_client(send: bool) -> Optional[glue.GlueClient]:
+    if not send:
+        return None
+    if not (config.GLUE_WEBHOOK_URL and glue.split_targets(config.GLUE_TARGET)):
+        print("Webhook URL or target not configured, skipping webhook")
+        return None
+    return glue.GlueClient(config.GLUE_WEBHOOK_URL)
+
+
+def submit_report(client: Optional[glue.GlueClient], deliveries: List[Future], message: str) -> None:
+    if client is None:
+        return
+    print("\nSending to Glue in the background...")
+    for target in glue.split_targets(config.GLUE_TARGET):
+        deliveries.append(client.submit(target, message))
+
+
+def wait_for_deliveries(client: glue.GlueClient, deliveries: List[Future]) -> None:
+    try:
+        for delivery in deliveries:
+            if delivery.result():
+                print("✅ Successfully sent to Glue!")
+            else:
+                print("❌ Failed to send to Glue")
+    finally:
+        client.close()
+
+
+def run(reports: List[str], send: bool = True, profilers: str = config.RUN_PROFILERS, trend_weeks: int = 12) -> None:
+    connection = MongoDBConnection()
+    recorder = instrumentation.RunRecorder("run_reports", profilers=profilers).start()
+    error = None
+
+    try:
+        print("Connecting to MongoDB...")
+        with recorder.stage("connect"):
+            connection.connect()
+
+        print("Fetching bills data...")
+        with recorder.stage("fetch") as stage:
+            raw_df = bills_analysis.fetch_bills(connection)
+            stage["rows_out"] = len(raw_df)
+
+        if raw_df.empty:
+            print("No bills found in the database.")
+            return
+
+        print(f"Found {len(raw_df)} bills")
+
+        print("Processing data...")
+        with recorder.stage("process", rows_in=len(raw_df)) as stage:
+            processed_df = bills_analysis.process_bills_data(raw_df, creators.lookup_identities(connection, raw_df))
+            stage["rows_out"] = len(processed_df)
+
+        client = glue_client(send)
+        deliveries = []
+
+        if "analysis" in reports:
+            with recorder.stage("analysis", rows_in=len(processed_df)):
+                run_analysis(processed_df)
+
+        if any(report in reports for report in ("daily", "weekly", "trend")):
+            with recorder.stage("index", rows_in=len(processed_df)):
+                indexed_df = periods.sort_by_time(processed_df)
+
+        if "daily" in reports:
+            with recorder.stage("daily", rows_in=len(indexed_df)):
+                submit_report(client, deliveries, build_daily_report(indexed_df))
+
+        if "weekly" in reports:
+            with recorder.stage("weekly", rows_in=len(indexed_df)):
+                submit_report(client, deliveries, build_weekly_report(indexed_df))
+
+        if "trend" in reports:
+            with recorder.stage("trend", rows_in=len(indexed_df)):
+                submit_report(client, deliveries, build_trend_report(indexed_df, trend_weeks))
+
+        if client is not None:
+            with recorder.stage("webhook"):
+                wait_for_deliveries(client, deliveries)
+
+    except Exception as e:
+        error = e
+        print(f"Error: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        connection.disconnect()
+        recorder.finish(error)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch bills once and produce several reports from the same data")
+    parser.add_argument("--reports", default=",".join(DEFAULT_REPORTS),
+                        help=f"comma-separated reports to produce from {','.join(REPORTS)} (default: {','.join(DEFAULT_REPORTS)})")
+    parser.add_argument("--trend-weeks", type=int, default=12, help="number of weeks in the trend report (default: 12)")
+    parser.add_argument("--no-webhook", action="store_true", help="print the reports without posting them to Glue")
+    parser.add_argument("--profile", default=config.RUN_PROFILERS,
+                        help=f"comma-separated profilers to enable ({','.join(instrumentation.PROFILERS)})")
+    args = parser.parse_args()
+
+    reports = [report.strip() for report in args.reports.split(",") if report.strip()]
+    unknown = [report for report in reports if report not in REPORTS]
+    if unknown:
+        parser.error(f"unknown reports: {', '.join(unknown)} (choose from {', '.join(REPORTS)})")
+
+    try:
+        instrumentation.parse_profilers(args.profile)
+    except ValueError as e:
+        parser.error(str(e))
+
+    run(reports, send=not args.no_webhook, profilers=args.profile, trend_weeks=args.trend_weeks)
+
+
+if __name__ == "__main__":
+    main()
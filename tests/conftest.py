@@ -0,0 +1,5 @@
+import os
+import sys
+
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
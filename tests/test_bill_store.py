@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+import mongomock
+import bill_store
+
+
+class StubConnection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def get_collection(self, database_name, collection_name):
+        return self.collection
+
+
+def make_bill(created_at, **fields):
+    return {"created_at": created_at, "updated_at": created_at, "created_by": "anna@example.com",
+            "vendor_name": "Enel Energia", "is_archived": False, **fields}
+
+
+def test_delta_sync_picks_up_bills_written_behind_the_watermark(tmp_path):
+    collection = mongomock.MongoClient().bills.utility_bills
+    now = datetime(2025, 11, 17, 12, 0)
+    collection.insert_many([make_bill(now - timedelta(hours=hours)) for hours in range(3)])
+    store = bill_store.BillStore(str(tmp_path))
+    connection = StubConnection(collection)
+
+    assert len(bill_store.sync_bills(connection, store, lag_minutes=10)) == 3
+    assert store.load_watermark() == now
+
+    late = collection.insert_one(make_bill(now - timedelta(minutes=5))).inserted_id
+    too_late = collection.insert_one(make_bill(now - timedelta(minutes=30))).inserted_id
+    collection.update_one({"created_at": now}, {"$set": {"is_archived": True, "updated_at": now + timedelta(minutes=1)}})
+
+    bills = bill_store.sync_bills(connection, store, lag_minutes=10)
+    assert bills["_id"].is_unique
+    assert late in set(bills["_id"])
+    assert too_late not in set(bills["_id"])
+    assert len(bill_store.active_bills(bills)) == 3
+    assert store.load_watermark() == now + timedelta(minutes=1)
@@ -0,0 +1,58 @@
+from datetime import datetime
+import mongomock
+import pandas as pd
+from bson import ObjectId
+import config
+import creators
+import rollup
+import weekly_comparison
+
+
+class StubConnection:
+    def __init__(self, client):
+        self.client = client
+
+    def get_collection(self, database_name, collection_name):
+        return self.client[database_name][collection_name]
+
+
+def make_bill(created_by, amount):
+    return {"created_at": datetime(2025, 11, 11, 9, 0), "created_by": created_by, "vendor_name": "Enel Energia",
+            "is_archived": False, "billing": {"current_bill_consumption": {"total_amount": amount}}}
+
+
+def test_server_breakdown_resolves_object_id_creators(tmp_path, monkeypatch):
+    client = mongomock.MongoClient()
+    user_id = ObjectId()
+    client.bills[config.USERS_COLLECTION].insert_one({"_id": user_id, "personal": {"first_name": "Marco", "last_name": "Rossi"}})
+    client.bills.utility_bills.insert_many([
+        make_bill(str(user_id), 10.0), make_bill(str(user_id), 20.0),
+        make_bill(str(ObjectId()), 5.0), make_bill("anna@example.com", 1.0)
+    ])
+    monkeypatch.setattr(config, "RESOLVE_CREATORS", True)
+    monkeypatch.chdir(tmp_path)
+
+    stats = weekly_comparison.fetch_week_stats(StubConnection(client), datetime(2025, 11, 10))
+
+    creator_stats = stats["creator_stats"]
+    assert list(creator_stats.index) == ["Marco Rossi", "agents", "anna@example.com"]
+    assert creator_stats.loc["Marco Rossi", "bill_amount"] == 30.0
+
+
+def test_rollup_breakdown_groups_resolved_creators():
+    user_id = str(ObjectId())
+    rows = [("2025-11-11", "Enel Energia", user_id, 2, 30.0), ("2025-11-12", "A2A", user_id, 1, 5.0),
+            ("2025-11-11", "Enel Energia", "Unknown", 1, 4.0), ("2025-11-11", "A2A", "anna@example.com", 1, 1.0)]
+    df = pd.DataFrame(rows, columns=["day", "vendor_name", "created_by", "bills_count", "bill_amount"])
+    df = df.assign(creator_normalized="agents", annual_kwh=0.0, annual_cost=0.0, day_start=pd.to_datetime(df["day"]))
+
+    stats = rollup.period_stats(df, datetime(2025, 11, 10), datetime(2025, 11, 17), breakdowns=True,
+                                identities={user_id: "Marco Rossi"})
+
+    assert stats["creator_stats"]["created_by"].to_dict() == {"Marco Rossi": 3, "agents": 1, "anna@example.com": 1}
+
+
+def test_creator_breakdown_keeps_agents_without_identities():
+    stats = pd.DataFrame({"created_by": [3, 2], "bill_amount": [1.0, 2.0]}, index=pd.Index([str(ObjectId()), "Unknown"], name="creator"))
+
+    assert creators.creator_breakdown(stats)["created_by"].to_dict() == {"agents": 5}
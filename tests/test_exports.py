@@ -0,0 +1,43 @@
+import os
+import pandas as pd
+import pytest
+import exports
+
+pytest.importorskip("pyarrow")
+
+
+def bills_frame(week_starts, rows_per_week=3):
+    week_start = pd.to_datetime([week for week in week_starts for _ in range(rows_per_week)])
+    return pd.DataFrame({
+        "week_start": week_start,
+        "vendor_name": ["Enel"] * len(week_start),
+        "bill_amount": [float(i) for i in range(len(week_start))]
+    })
+
+
+def week_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.startswith("week="))
+
+
+@pytest.mark.parametrize("mode", exports.MODES)
+def test_weeks_missing_from_frame_are_removed(tmp_path, mode):
+    directory = str(tmp_path)
+    exports.export_partitioned(bills_frame(["2025-11-03", "2025-11-10", "2025-11-17"]), directory, mode=mode)
+    assert len(week_files(directory)) == 3
+
+    current = bills_frame(["2025-11-03", "2025-11-17"])
+    exports.export_partitioned(current, directory, mode=mode)
+
+    assert week_files(directory) == ["week=2025-W45.parquet", "week=2025-W47.parquet"]
+    assert sorted(exports.load_manifest(directory)["partitions"]) == ["2025-W45", "2025-W47"]
+    assert len(exports.load_partitions(directory)) == len(current)
+
+
+def test_upsert_skips_unchanged_partitions(tmp_path):
+    directory = str(tmp_path)
+    df = bills_frame(["2025-11-03", "2025-11-10"])
+    assert exports.export_partitioned(df, directory) == ["2025-W45", "2025-W46"]
+
+    df.loc[df["week_start"] == "2025-11-10", "bill_amount"] += 1
+    assert exports.export_partitioned(df, directory) == ["2025-W46"]
+    pd.testing.assert_frame_equal(exports.load_partitions(directory), df, check_dtype=False)
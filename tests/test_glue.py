@@ -0,0 +1,123 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+import glue
+
+
+class StubGlue:
+    def __init__(self):
+        self.statuses = []
+        self.requests = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.requests.append({"key": self.headers["Idempotency-Key"], **body})
+                    status = stub.statuses.pop(0) if stub.statuses else 200
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/webhook"
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubGlue()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def make_client(stub):
+    clients = []
+
+    def make(**options):
+        client = glue.GlueClient(stub.url, backoff=0, session=requests.Session(), **options)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+def test_retries_throttled_and_server_errors(stub, make_client, status):
+    stub.statuses = [status, status]
+
+    assert make_client(max_retries=3).send(["reports"], "hello") == {"reports": True}
+    assert len(stub.requests) == 3
+    assert len({request["key"] for request in stub.requests}) == 1
+
+
+def test_gives_up_after_max_retries(stub, make_client):
+    stub.statuses = [503] * 10
+
+    assert make_client(max_retries=2).send(["reports"], "hello") == {"reports": False}
+    assert len(stub.requests) == 3
+
+
+def test_client_errors_are_not_retried(stub, make_client):
+    stub.statuses = [400]
+
+    assert make_client(max_retries=3).send(["reports"], "hello") == {"reports": False}
+    assert len(stub.requests) == 1
+
+
+def test_idempotency_key_is_stable_across_runs(stub, make_client):
+    make_client().send(["reports"], "weekly report")
+    make_client().send(["reports"], "weekly report")
+    make_client().send(["alerts"], "weekly report")
+
+    keys = [request["key"] for request in stub.requests]
+    assert keys[0] == keys[1]
+    assert keys[2] != keys[0]
+
+
+def test_chunks_are_posted_in_order_with_distinct_keys(stub, make_client):
+    blocks = [f"Block {index}\n" + "x" * 60 for index in range(12)]
+    message = "\n\n".join(blocks)
+    stub.statuses = [503, 200, 429]
+
+    assert make_client(max_message_chars=200).send(["reports"], message) == {"reports": True}
+
+    delivered = {}
+    for request in stub.requests:
+        delivered.setdefault(request["key"], request["text"])
+    texts = list(delivered.values())
+    assert len(texts) > 1
+    assert all(len(text) <= 200 for text in texts)
+    assert [text.rsplit("(part ", 1)[1] for text in texts] == [f"{part}/{len(texts)})" for part in range(1, len(texts) + 1)]
+    assert "\n\n".join(text.rsplit("\n\n(part ", 1)[0] for text in texts) == message
+
+
+def test_messages_to_one_target_keep_their_order(stub, make_client):
+    client = make_client(max_message_chars=100)
+    first, second = ["\n\n".join(f"{name}-{part} " + "x" * 60 for part in range(1, 4)) for name in ("first", "second")]
+    stub.statuses = [503, 200, 503]
+
+    futures = [client.submit("reports", first), client.submit("reports", second)]
+    assert [future.result() for future in futures] == [True, True]
+
+    delivered = {}
+    for request in stub.requests:
+        delivered.setdefault(request["key"], request["text"])
+    assert [text.split(" ")[0] for text in delivered.values()] == [
+        "first-1", "first-2", "first-3", "second-1", "second-2", "second-3"
+    ]
@@ -0,0 +1,209 @@
+from datetime import timedelta
+import mongomock
+import pytest
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+import config
+import live_metrics
+
+
+def make_bill(metrics, amount=100.0, kwh=2000, cost=600.0, **fields):
+    bill = {
+        "_id": ObjectId(),
+        "created_at": metrics.today() + timedelta(hours=1),
+        "created_by": "anna@example.com",
+        "vendor_name": "Enel Energia",
+        "is_archived": False,
+        "billing": {
+            "current_bill_consumption": {"total_amount": amount},
+            "annual_consumption": {"total": kwh, "cost": {"previous_year_annual_cost": cost}}
+        }
+    }
+    bill.update(fields)
+    return bill
+
+
+def change(operation, bill, token="1"):
+    event = {"_id": {"_data": token}, "operationType": operation, "documentKey": {"_id": bill["_id"]}}
+    if operation != "delete":
+        event["fullDocument"] = bill
+    return event
+
+
+def today_stats(metrics, breakdowns=False):
+    return metrics.day_stats(metrics.today(), breakdowns)
+
+
+@pytest.fixture
+def metrics(tmp_path):
+    return live_metrics.LiveMetrics(state_path=str(tmp_path / "live.json"), days=2, timezone="UTC")
+
+
+def test_insert_update_archive_and_delete(metrics):
+    bill = make_bill(metrics)
+    other = make_bill(metrics, amount=50.0, kwh=1000, cost=300.0, vendor_name="Sorgenia")
+
+    metrics.apply_change(change("insert", bill))
+    metrics.apply_change(change("insert", other))
+    stats = today_stats(metrics, breakdowns=True)
+    assert stats["bills_count"] == 2
+    assert stats["total_bill_amount"] == 150.0
+    assert stats["total_annual_kwh"] == 3000
+    assert stats["avg_annual_cost_per_bill"] == 450.0
+    assert stats["vendor_stats"]["created_by"].to_dict() == {"Enel Energia": 1, "Sorgenia": 1}
+
+    metrics.apply_change(change("update", {**bill, "billing": {"current_bill_consumption": {"total_amount": 120.0}}}))
+    stats = today_stats(metrics)
+    assert stats["bills_count"] == 2
+    assert stats["total_bill_amount"] == 170.0
+    assert stats["total_annual_cost"] == 300.0
+
+    metrics.apply_change(change("update", {**other, "is_archived": True}))
+    assert today_stats(metrics)["bills_count"] == 1
+    assert today_stats(metrics)["total_bill_amount"] == 120.0
+
+    metrics.apply_change(change("delete", bill))
+    assert today_stats(metrics)["bills_count"] == 0
+    assert metrics.counters == {}
+    assert metrics.events == 5
+
+
+def test_excluded_and_out_of_window_bills_are_ignored(metrics):
+    metrics.apply_change(change("insert", make_bill(metrics, created_by=config.EXCLUDED_USER_IDS[0])))
+    metrics.apply_change(change("insert", make_bill(metrics, created_at=metrics.today() - timedelta(days=5))))
+    metrics.apply_change(change("insert", make_bill(metrics, created_at=None)))
+
+    assert metrics.contributions == {}
+    assert today_stats(metrics)["bills_count"] == 0
+
+
+def test_resume_token_and_counters_survive_restart(metrics):
+    bill = make_bill(metrics)
+    metrics.apply_change(change("insert", bill))
+    metrics.resume_token = {"_data": "8265AB"}
+    metrics.save()
+
+    restored = live_metrics.LiveMetrics(state_path=metrics.state_path, days=2, timezone="UTC")
+    assert restored.load()
+    assert restored.resume_token == {"_data": "8265AB"}
+    assert today_stats(restored) == today_stats(metrics)
+
+    other_zone = live_metrics.LiveMetrics(state_path=metrics.state_path, days=2, timezone="Europe/Rome")
+    assert not other_zone.load()
+
+
+class FakeStream:
+    def __init__(self, changes, resume_token):
+        self.changes = list(changes)
+        self.resume_token = resume_token
+        self.alive = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.alive = False
+
+    def try_next(self):
+        if not self.changes:
+            return None
+        event = self.changes.pop(0)
+        self.resume_token = event["_id"]
+        return event
+
+
+class WatchedCollection:
+    def __init__(self, collection, changes=(), error_code=None):
+        self.collection = collection
+        self.changes = changes
+        self.error_code = error_code
+        self.resumed_after = []
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def watch(self, pipeline, resume_after=None, **options):
+        if resume_after is not None:
+            self.resumed_after.append(resume_after)
+            if self.error_code is not None:
+                raise OperationFailure("resume point lost", code=self.error_code)
+        return FakeStream(self.changes, {"_data": "start"})
+
+
+def seeded_collection(bills):
+    collection = mongomock.MongoClient().bills.utility_bills
+    if bills:
+        collection.insert_many(bills)
+    return collection
+
+
+def test_reseeds_when_resume_token_has_left_the_oplog(metrics):
+    bills = [make_bill(metrics), make_bill(metrics, is_archived=True), make_bill(metrics, amount=20.0)]
+    collection = WatchedCollection(seeded_collection(bills), error_code=live_metrics.CHANGE_STREAM_HISTORY_LOST)
+    metrics.resume_token = {"_data": "expired"}
+    metrics.apply("stale", metrics.contribution(make_bill(metrics)))
+
+    live_metrics.open_stream(collection, metrics)
+
+    assert collection.resumed_after == [{"_data": "expired"}]
+    assert metrics.resume_token == {"_data": "start"}
+    assert sorted(metrics.contributions) == sorted(str(bill["_id"]) for bill in bills if not bill["is_archived"])
+    assert today_stats(metrics)["total_bill_amount"] == 120.0
+
+
+def test_other_resume_errors_are_raised(metrics):
+    collection = WatchedCollection(seeded_collection([make_bill(metrics)]), error_code=280)
+    metrics.resume_token = {"_data": "expired"}
+
+    with pytest.raises(OperationFailure):
+        live_metrics.open_stream(collection, metrics)
+
+
+class StubConnection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def get_collection(self, database_name, collection_name):
+        return self.collection
+
+
+def test_run_applies_changes_and_checkpoints_the_resume_token(metrics):
+    bill = make_bill(metrics)
+    changes = [change("insert", bill, "2"), change("update", {**bill, "is_archived": True}, "3"),
+               change("insert", make_bill(metrics, amount=75.0), "4")]
+    collection = WatchedCollection(seeded_collection([]), changes)
+
+    live_metrics.run(StubConnection(collection), metrics, duration=0.2, status_seconds=60)
+
+    restored = live_metrics.LiveMetrics(state_path=metrics.state_path, days=2, timezone="UTC")
+    assert restored.load()
+    assert restored.resume_token == {"_data": "4"}
+    assert today_stats(restored)["bills_count"] == 1
+    assert today_stats(restored)["total_bill_amount"] == 75.0
+
+    live_metrics.run(StubConnection(collection), restored, duration=0.1, status_seconds=60)
+    assert collection.resumed_after == [{"_data": "4"}]
+
+
+def test_creator_breakdown_resolves_new_ids_in_batches(metrics, monkeypatch):
+    known, new = str(ObjectId()), str(ObjectId())
+    lookups = []
+
+    def resolve_creators(connection, created_by):
+        lookups.append(sorted(created_by))
+        return {known: "Marco Rossi"}
+
+    monkeypatch.setattr(config, "RESOLVE_CREATORS", True)
+    monkeypatch.setattr(live_metrics.creators, "resolve_creators", resolve_creators)
+
+    metrics.apply_change(change("insert", make_bill(metrics, created_by=known)))
+    metrics.apply_change(change("insert", make_bill(metrics)))
+    metrics.resolve_creators(None)
+    metrics.apply_change(change("insert", make_bill(metrics, created_by=new)))
+    metrics.resolve_creators(None)
+    metrics.resolve_creators(None)
+
+    assert lookups == [[known], [new]]
+    assert today_stats(metrics, breakdowns=True)["creator_stats"]["created_by"].to_dict() == {
+        "Marco Rossi": 1, "agents": 1, "anna@example.com": 1
+    }
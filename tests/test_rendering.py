@@ -0,0 +1,47 @@
+import io
+import json
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+import analyze_database
+import rendering
+import weekly_comparison
+
+
+def week_stats(count):
+    breakdown = pd.DataFrame({"created_by": [np.int64(count)], "bill_amount": [12.5], "annual_kwh": [300.0], "annual_cost": [90.0]},
+                             index=pd.Index(["Enel"], name="vendor_name"))
+    return {
+        "bills_count": np.int64(count),
+        "total_bill_amount": np.float64(12.5),
+        "total_annual_kwh": 300.0,
+        "total_annual_cost": 90.0,
+        "avg_annual_cost_per_bill": 90.0 / count,
+        "creator_stats": breakdown,
+        "vendor_stats": breakdown
+    }
+
+
+def test_json_report_is_the_stats_data():
+    data = json.loads(weekly_comparison.generate_comparison_report(week_stats(3), week_stats(2), 46, 45, "json"))
+
+    assert data["current_week_num"] == 46
+    assert data["current_week"]["bills_count"] == 3
+    assert data["last_week"]["vendor_stats"] == {"Enel": {"created_by": 2, "bill_amount": 12.5, "annual_kwh": 300.0, "annual_cost": 90.0}}
+
+
+def test_json_scan_report_streams_findings():
+    findings = {"billing": {"utility_bills": {"total_count": 10, "week_count": 4, "count_method": "exact",
+                                              "fields": {"vendor_name": "str"}, "indexes": [{"name": "_id_", "keys": {"_id": 1}}]}}}
+    out = io.StringIO()
+
+    assert analyze_database.generate_report(findings, datetime(2025, 11, 10), "json", out) == ""
+    data = json.loads(out.getvalue())
+    assert data["week_start"] == "2025-11-10T00:00:00"
+    assert data["databases"] == findings
+
+
+def test_writer_rejects_json_layout():
+    with pytest.raises(ValueError):
+        rendering.ReportWriter(io.StringIO(), "json")
@@ -1,9 +1,22 @@
 import pandas as pd
 from datetime import datetime, timedelta
-from main import MongoDBConnection
+from main import MongoDBConnection, apply_batch_size
+import async_queries
+import bill_store
+import billing_fields
+import bills_queries
+import bucketing
 import config
-import requests
-from typing import Optional
+import creators
+import frame_dtypes
+import glue
+import ingest
+import instrumentation
+import parallel_fetch
+import periods
+import rendering
+import rollup
+from typing import Dict, Optional, TextIO
 
 
 def get_week_start(date: datetime) -> datetime:
@@ -12,19 +25,10 @@ def get_week_start(date: datetime) -> datetime:
     return week_start.replace(hour=0, minute=0, second=0, microsecond=0)
 
 
-def is_email(value: str) -> bool:
-    return isinstance(value, str) and "@" in value
-
-
-def normalize_creator(created_by: str) -> str:
-    if pd.isna(created_by) or created_by == "Unknown":
-        return "agents"
-    if is_email(created_by):
-        return created_by
-    return "agents"
-
-
 def fetch_bills(connection: MongoDBConnection) -> pd.DataFrame:
+    if config.BILL_STORE_DIR:
+        return bill_store.fetch_bills(connection)
+    
     collection = connection.get_collection("bills", "utility_bills")
     
     query = {
@@ -41,46 +45,53 @@ def fetch_bills(connection: MongoDBConnection) -> pd.DataFrame:
         "billing.annual_consumption.cost.previous_year_annual_cost": 1
     }
     
-    cursor = collection.find(query, projection)
+    if parallel_fetch.enabled():
+        return parallel_fetch.fetch_partitioned(connection, "bills", "utility_bills", query, projection,
+                                                ingest.fields_for_projection(projection))
+    
+    cursor = apply_batch_size(collection.find(query, projection))
+    if config.STREAM_BATCH_SIZE:
+        return ingest.stream_to_frame(cursor, ingest.fields_for_projection(projection), config.STREAM_BATCH_SIZE)
+    
     data = list(cursor)
     
     return pd.DataFrame(data)
 
 
-def process_bills_data(df: pd.DataFrame) -> pd.DataFrame:
+def process_bills_data(df: pd.DataFrame, identities: Optional[Dict[str, str]] = None) -> pd.DataFrame:
     if df.empty:
         return pd.DataFrame()
     
     df = df.copy()
     
     df['created_at'] = pd.to_datetime(df['created_at'])
-    df['week_start'] = df['created_at'].apply(get_week_start)
-    df['week_number'] = df['week_start'].apply(lambda x: x.isocalendar()[1])
-    
-    df['bill_amount'] = df['billing'].apply(
-        lambda x: x.get('current_bill_consumption', {}).get('total_amount', 0) if isinstance(x, dict) else 0
-    )
-    
-    df['annual_kwh'] = df['billing'].apply(
-        lambda x: x.get('annual_consumption', {}).get('total', 0) if isinstance(x, dict) else 0
-    )
+    buckets = bucketing.assign_buckets(df['created_at'])
+    df['day_start'] = buckets['day_start']
+    df['week_start'] = buckets['week_start']
+    df['week_number'] = buckets['week_number']
     
-    df['annual_cost'] = df['billing'].apply(
-        lambda x: x.get('annual_consumption', {}).get('cost', {}).get('previous_year_annual_cost', 0) 
-        if isinstance(x, dict) and isinstance(x.get('annual_consumption', {}), dict) 
-        and isinstance(x.get('annual_consumption', {}).get('cost', {}), dict) else 0
-    )
+    metrics = billing_fields.extract_billing_metrics(df)
+    df['bill_amount'] = metrics['bill_amount']
+    df['annual_kwh'] = metrics['annual_kwh']
+    df['annual_cost'] = metrics['annual_cost']
     
     df['vendor_name'] = df['vendor_name'].fillna('Unknown')
-    df['created_by'] = df['created_by'].fillna('Unknown')
-    df['creator_normalized'] = df['created_by'].apply(normalize_creator)
+    df['created_by'] = frame_dtypes.to_category(df['created_by'].fillna('Unknown'))
+    df['creator_normalized'] = creators.normalize_creators(df['created_by'], identities)
+    df = frame_dtypes.compact_bills(df)
     
-    return df[['week_start', 'week_number', 'created_by', 'creator_normalized', 'vendor_name',
-               'bill_amount', 'annual_kwh', 'annual_cost']]
+    return periods.sort_by_time(df[['day_start', 'week_start', 'week_number', 'created_by', 'creator_normalized', 'vendor_name',
+                                    'bill_amount', 'annual_kwh', 'annual_cost']])
+
+
+def get_report_weeks(today: datetime) -> tuple:
+    current_week_start = get_week_start(today)
+    last_week_start = current_week_start - timedelta(days=7)
+    return current_week_start, last_week_start
 
 
 def get_week_stats(df: pd.DataFrame, week_start: datetime) -> dict:
-    week_data = df[df['week_start'] == week_start]
+    week_data = periods.slice_period(df, week_start, week_start + timedelta(days=7))
     
     if week_data.empty:
         return {
@@ -97,14 +108,14 @@ def get_week_stats(df: pd.DataFrame, week_start: datetime) -> dict:
     total_annual_cost = week_data['annual_cost'].sum()
     avg_annual_cost_per_bill = total_annual_cost / bills_count if bills_count > 0 else 0
     
-    creator_stats = week_data.groupby('creator_normalized').agg({
+    creator_stats = week_data.groupby('creator_normalized', observed=True).agg({
         'created_by': 'count',
         'bill_amount': 'sum',
         'annual_kwh': 'sum',
         'annual_cost': 'sum'
     }).sort_values('created_by', ascending=False)
     
-    vendor_stats = week_data.groupby('vendor_name').agg({
+    vendor_stats = week_data.groupby('vendor_name', observed=True).agg({
         'created_by': 'count',
         'bill_amount': 'sum',
         'annual_kwh': 'sum',
@@ -122,6 +133,46 @@ def get_week_stats(df: pd.DataFrame, week_start: datetime) -> dict:
     }
 
 
+def breakdown_to_frame(rows: list, index_name: str) -> pd.DataFrame:
+    frame = pd.DataFrame(rows, columns=['_id', 'bills_count', 'bill_amount', 'annual_kwh', 'annual_cost'])
+    frame = frame.rename(columns={'_id': index_name, 'bills_count': 'created_by'})
+    return frame.set_index(index_name)
+
+
+def fetch_week_stats(connection: MongoDBConnection, week_start: datetime) -> dict:
+    collection = connection.get_collection(bills_queries.BILLS_DATABASE, bills_queries.BILLS_COLLECTION)
+    start, end = bucketing.utc_window(week_start, week_start + timedelta(days=7))
+    pipeline = bills_queries.period_breakdown_pipeline(start, end)
+    result = next(collection.aggregate(pipeline), {})
+    
+    stats = bills_queries.totals_to_stats(result.get('totals', []))
+    if stats['bills_count'] == 0:
+        return stats
+    
+    stats['creator_stats'] = creators.resolve_breakdown(connection, breakdown_to_frame(result.get('creators', []), 'creator'))
+    stats['vendor_stats'] = breakdown_to_frame(result.get('vendors', []), 'vendor_name')
+    return stats
+
+
+def fetch_week_stats_concurrently(connection: MongoDBConnection, current_week_start: datetime, last_week_start: datetime) -> tuple:
+    current_window = bucketing.utc_window(current_week_start, current_week_start + timedelta(days=7))
+    last_window = bucketing.utc_window(last_week_start, last_week_start + timedelta(days=7))
+    
+    results = async_queries.run_pipelines({
+        'current_week': bills_queries.period_totals_pipeline(*current_window),
+        'last_week': bills_queries.period_totals_pipeline(*last_window),
+        'top_vendors': bills_queries.period_group_pipeline(*current_window, bills_queries.vendor_key(), limit=3),
+        'creators': bills_queries.period_group_pipeline(*current_window, bills_queries.creator_key())
+    })
+    
+    current_week_stats = bills_queries.totals_to_stats(results['current_week'])
+    if current_week_stats['bills_count'] > 0:
+        current_week_stats['creator_stats'] = creators.resolve_breakdown(connection, breakdown_to_frame(results['creators'], 'creator'))
+        current_week_stats['vendor_stats'] = breakdown_to_frame(results['top_vendors'], 'vendor_name')
+    
+    return current_week_stats, bills_queries.totals_to_stats(results['last_week'])
+
+
 def format_change(current: float, previous: float, reverse: bool = False) -> str:
     if previous == 0:
         return "🟢 NEW" if current > 0 else "⚪"
@@ -142,101 +193,166 @@ def format_change(current: float, previous: float, reverse: bool = False) -> str
     return f"{emoji} {sign}{change:.1f}%"
 
 
-def generate_comparison_report(current_week: dict, last_week: dict, current_week_num: int, last_week_num: int) -> str:
-    report = f"## 📊 Weekly Bills Comparison\n\n"
-    report += f"**Week {current_week_num}** vs **Week {last_week_num}**\n\n"
-    report += "---\n\n"
+def write_breakdown(writer: rendering.ReportWriter, stats: pd.DataFrame, limit: int) -> None:
+    for name, row in stats.head(limit).iterrows():
+        writer.bullets([
+            f"Bills: {int(row['created_by'])}",
+            f"Bill Amount: €{row['bill_amount']:,.2f}",
+            f"Annual kWh: {row['annual_kwh']:,.0f} kWh",
+            f"Annual Cost: €{row['annual_cost']:,.2f}"
+        ], title=f"**{name}**")
+
+
+def write_comparison_report(writer: rendering.ReportWriter, current_week: dict, last_week: dict, current_week_num: int, last_week_num: int) -> None:
+    writer.heading("📊 Weekly Bills Comparison")
+    writer.paragraph(f"**Week {current_week_num}** vs **Week {last_week_num}**")
+    writer.rule()
     
-    report += "### Overall Metrics\n\n"
+    writer.heading("Overall Metrics", 3)
     
     bills_change = format_change(current_week['bills_count'], last_week['bills_count'])
-    report += f"**Bills Added:** {current_week['bills_count']} (vs {last_week['bills_count']}) {bills_change}\n\n"
+    writer.paragraph(f"**Bills Added:** {current_week['bills_count']} (vs {last_week['bills_count']}) {bills_change}")
     
     amount_change = format_change(current_week['total_bill_amount'], last_week['total_bill_amount'])
-    report += f"**Total Bill Amount:** €{current_week['total_bill_amount']:,.2f} (vs €{last_week['total_bill_amount']:,.2f}) {amount_change}\n\n"
+    writer.paragraph(f"**Total Bill Amount:** €{current_week['total_bill_amount']:,.2f} (vs €{last_week['total_bill_amount']:,.2f}) {amount_change}")
     
     kwh_change = format_change(current_week['total_annual_kwh'], last_week['total_annual_kwh'])
-    report += f"**Total Annual kWh:** {current_week['total_annual_kwh']:,.0f} kWh (vs {last_week['total_annual_kwh']:,.0f} kWh) {kwh_change}\n\n"
+    writer.paragraph(f"**Total Annual kWh:** {current_week['total_annual_kwh']:,.0f} kWh (vs {last_week['total_annual_kwh']:,.0f} kWh) {kwh_change}")
     
     cost_change = format_change(current_week['total_annual_cost'], last_week['total_annual_cost'])
-    report += f"**Total Annual Cost:** €{current_week['total_annual_cost']:,.2f} (vs €{last_week['total_annual_cost']:,.2f}) {cost_change}\n\n"
+    writer.paragraph(f"**Total Annual Cost:** €{current_week['total_annual_cost']:,.2f} (vs €{last_week['total_annual_cost']:,.2f}) {cost_change}")
     
     avg_cost_change = format_change(current_week['avg_annual_cost_per_bill'], last_week['avg_annual_cost_per_bill'])
-    report += f"**Avg Annual Cost per Bill:** €{current_week['avg_annual_cost_per_bill']:,.2f} (vs €{last_week['avg_annual_cost_per_bill']:,.2f}) {avg_cost_change}\n\n"
+    writer.paragraph(f"**Avg Annual Cost per Bill:** €{current_week['avg_annual_cost_per_bill']:,.2f} (vs €{last_week['avg_annual_cost_per_bill']:,.2f}) {avg_cost_change}")
     
-    report += "---\n\n"
-    report += "### Top Energy Providers This Week\n\n"
+    writer.rule()
+    writer.heading("Top Energy Providers This Week", 3)
     
     if 'vendor_stats' in current_week and not current_week['vendor_stats'].empty:
-        for vendor, row in current_week['vendor_stats'].head(3).iterrows():
-            report += f"**{vendor}**\n"
-            report += f"- Bills: {int(row['created_by'])}\n"
-            report += f"- Bill Amount: €{row['bill_amount']:,.2f}\n"
-            report += f"- Annual kWh: {row['annual_kwh']:,.0f} kWh\n"
-            report += f"- Annual Cost: €{row['annual_cost']:,.2f}\n\n"
+        write_breakdown(writer, current_week['vendor_stats'], 3)
     
-    report += "---\n\n"
-    report += "### Top Contributors This Week\n\n"
+    writer.rule()
+    writer.heading("Top Contributors This Week", 3)
     
     if 'creator_stats' in current_week and not current_week['creator_stats'].empty:
-        for creator, row in current_week['creator_stats'].head(5).iterrows():
-            report += f"**{creator}**\n"
-            report += f"- Bills: {int(row['created_by'])}\n"
-            report += f"- Bill Amount: €{row['bill_amount']:,.2f}\n"
-            report += f"- Annual kWh: {row['annual_kwh']:,.0f} kWh\n"
-            report += f"- Annual Cost: €{row['annual_cost']:,.2f}\n\n"
-    
-    return report
+        write_breakdown(writer, current_week['creator_stats'], 5)
 
 
-def send_to_glue(webhook_url: str, target: str, message: str) -> bool:
-    try:
-        response = requests.post(
-            webhook_url,
-            json={
-                "target": target,
-                "text": message
-            },
-            headers={"Content-Type": "application/json"},
-            timeout=10
-        )
-        response.raise_for_status()
-        return True
-    except Exception as e:
-        print(f"Error sending to Glue: {e}")
-        return False
+def generate_comparison_report(current_week: dict, last_week: dict, current_week_num: int, last_week_num: int,
+                               fmt: str = "markdown", out: Optional[TextIO] = None) -> str:
+    if fmt == "json":
+        return rendering.render_data({
+            "current_week_num": current_week_num,
+            "last_week_num": last_week_num,
+            "current_week": current_week,
+            "last_week": last_week
+        }, out)
+    return rendering.render(
+        lambda writer: write_comparison_report(writer, current_week, last_week, current_week_num, last_week_num),
+        fmt, "Weekly Bills Comparison", out
+    )
+
+
+def generate_trend_report(weekly_stats: pd.DataFrame, monthly_stats: pd.DataFrame) -> str:
+    lines = [
+        "## 📈 Weekly Bills Trend",
+        "",
+        f"**Last {len(weekly_stats)} weeks**",
+        "",
+        "| Week | From | Bills | Change | Bill Amount | Annual kWh | Annual Cost | Avg Cost/Bill |",
+        "|------|------|-------|--------|-------------|------------|-------------|---------------|"
+    ]
+    
+    previous_count = None
+    for label, row in weekly_stats.iterrows():
+        change = format_change(row['bills_count'], previous_count) if previous_count is not None else ""
+        lines.append(f"| {label} | {row['start'].strftime('%Y-%m-%d')} | {int(row['bills_count'])} | {change} | "
+                     f"€{row['total_bill_amount']:,.2f} | {row['total_annual_kwh']:,.0f} kWh | "
+                     f"€{row['total_annual_cost']:,.2f} | €{row['avg_annual_cost_per_bill']:,.2f} |")
+        previous_count = row['bills_count']
+    
+    if len(monthly_stats) == 2:
+        previous, current = monthly_stats.iloc[0], monthly_stats.iloc[1]
+        lines += [
+            "",
+            "---",
+            "",
+            f"### {monthly_stats.index[1]} vs {monthly_stats.index[0]}",
+            "",
+            f"**Bills Added:** {int(current['bills_count'])} (vs {int(previous['bills_count'])}) "
+            f"{format_change(current['bills_count'], previous['bills_count'])}",
+            "",
+            f"**Total Bill Amount:** €{current['total_bill_amount']:,.2f} (vs €{previous['total_bill_amount']:,.2f}) "
+            f"{format_change(current['total_bill_amount'], previous['total_bill_amount'])}",
+            "",
+            f"**Total Annual Cost:** €{current['total_annual_cost']:,.2f} (vs €{previous['total_annual_cost']:,.2f}) "
+            f"{format_change(current['total_annual_cost'], previous['total_annual_cost'])}"
+        ]
+    
+    return "\n".join(lines) + "\n"
 
 
 def main():
     connection = MongoDBConnection()
+    recorder = instrumentation.RunRecorder("weekly_comparison").start()
+    error = None
     
     try:
         print("Connecting to MongoDB...")
-        connection.connect()
-        
-        print("Fetching bills data...")
-        raw_df = fetch_bills(connection)
-        
-        if raw_df.empty:
-            print("No bills found in the database.")
-            return
-        
-        print("Processing data...")
-        processed_df = process_bills_data(raw_df)
+        with recorder.stage("connect"):
+            connection.connect()
         
-        today = datetime.now()
-        current_week_start = get_week_start(today)
-        last_week_start = current_week_start - timedelta(days=7)
+        current_week_start, last_week_start = get_report_weeks(bucketing.local_now())
         
         current_week_num = current_week_start.isocalendar()[1]
         last_week_num = last_week_start.isocalendar()[1]
         
-        print(f"Analyzing Week {current_week_num} vs Week {last_week_num}...")
-        
-        current_week_stats = get_week_stats(processed_df, current_week_start)
-        last_week_stats = get_week_stats(processed_df, last_week_start)
+        if config.STATS_MODE == "server":
+            print(f"Aggregating Week {current_week_num} vs Week {last_week_num} in MongoDB...")
+            
+            with recorder.stage("aggregate"):
+                if config.ASYNC_QUERIES:
+                    current_week_stats, last_week_stats = fetch_week_stats_concurrently(connection, current_week_start, last_week_start)
+                else:
+                    current_week_stats = fetch_week_stats(connection, current_week_start)
+                    last_week_stats = fetch_week_stats(connection, last_week_start)
+        elif config.STATS_MODE == "rollup":
+            with recorder.stage("fetch") as stage:
+                rollup.refresh_rollup(connection)
+                
+                current_week_end = current_week_start + timedelta(days=7)
+                rollup_df = rollup.read_rollup(connection, last_week_start, current_week_end)
+                stage["rows_out"] = len(rollup_df)
+            
+            print(f"Analyzing Week {current_week_num} vs Week {last_week_num} from the daily rollup...")
+            
+            with recorder.stage("aggregate", rows_in=len(rollup_df)):
+                identities = creators.lookup_identities(connection, rollup_df)
+                current_week_stats = rollup.period_stats(rollup_df, current_week_start, current_week_end, breakdowns=True, identities=identities)
+                last_week_stats = rollup.period_stats(rollup_df, last_week_start, current_week_start, breakdowns=True, identities=identities)
+        else:
+            print("Fetching bills data...")
+            with recorder.stage("fetch") as stage:
+                raw_df = fetch_bills(connection)
+                stage["rows_out"] = len(raw_df)
+            
+            if raw_df.empty:
+                print("No bills found in the database.")
+                return
+            
+            print("Processing data...")
+            with recorder.stage("process", rows_in=len(raw_df)) as stage:
+                processed_df = process_bills_data(raw_df, creators.lookup_identities(connection, raw_df))
+                stage["rows_out"] = len(processed_df)
+            
+            print(f"Analyzing Week {current_week_num} vs Week {last_week_num}...")
+            
+            with recorder.stage("aggregate", rows_in=len(processed_df)):
+                current_week_stats = get_week_stats(processed_df, current_week_start)
+                last_week_stats = get_week_stats(processed_df, last_week_start)
         
-        report = generate_comparison_report(current_week_stats, last_week_stats, current_week_num, last_week_num)
+        with recorder.stage("render"):
+            report = generate_comparison_report(current_week_stats, last_week_stats, current_week_num, last_week_num)
         
         print("\n" + "="*80)
         print("WEEKLY COMPARISON REPORT")
@@ -256,7 +372,9 @@ def main():
             
             if target:
                 print("\nSending to Glue...")
-                if send_to_glue(webhook_url, target, report):
+                with recorder.stage("webhook"):
+                    sent = glue.send_to_glue(webhook_url, target, report)
+                if sent:
                     print("✅ Successfully sent to Glue!")
                 else:
                     print("❌ Failed to send to Glue")
@@ -266,11 +384,13 @@ def main():
             print("No webhook URL provided, skipping webhook")
         
     except Exception as e:
+        error = e
         print(f"Error: {e}")
         import traceback
         traceback.print_exc()
     finally:
         connection.disconnect()
+        recorder.finish(error)
 
 
 if __name__ == "__main__":